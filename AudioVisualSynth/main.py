@@ -1,8 +1,42 @@
+import argparse
 import asyncio
+import sys
+import threading
+from collections import OrderedDict
 import pygame
 from pygame.locals import *
 import numpy as np
 
+try:
+    # The shared music package, when run as python -m AudioVisualSynth.main from the
+    # repository. The browser build bundles this file alone and uses the local
+    # sine oscillator, on-the-fly notes and pygame's frame clock instead.
+    from music.wavetable import get_wavetable, midi_to_frequency
+    from music.graphics.timing import SimulationClock, FramePacer
+    from music.sample_bank import open_bank
+except ImportError:
+    get_wavetable = midi_to_frequency = SimulationClock = FramePacer = open_bank = None
+
+FRAME_RATE = 60
+# Particle sprites are cached for this many alpha steps, and at most this many sprites
+SPRITE_ALPHA_LEVELS = 32
+MAX_SPRITES = 2048
+BACKGROUND_COLOR = (30, 30, 30)
+# Above this many dirty rectangles a frame is pushed with a full flip instead
+MAX_DIRTY_RECTS = 200
+# keys_being_pressed entry of the note held with the mouse
+MOUSE_KEY = 0
+# Mixer channels of the sound bank; the oldest note is cut when all are busy
+MIXER_CHANNELS = 16
+# The timbre of the notes; the sample bank is rebuilt when any of these change
+NOTE_WAVEFORM = "sine"
+NOTE_ENVELOPE = {
+    "attack_time": 0.01,
+    "decay_time": 0.1,
+    "sustain_level": 0.7,
+    "release_time": 0.2,
+}
+
 # Note to MIDI and color mappings
 note_to_midi = {
     "C3": 48, "C#3": 49, "D3": 50, "D#3": 51, "E3": 52, "F3": 53, "F#3": 54,
@@ -37,45 +71,113 @@ key_to_note = {
     pygame.K_SPACE: 48
 }
 
-import random
-
 # Particle class
 class Particle:
-    def __init__(self, x, y, color):
+    def __init__(self, x, y, color, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
         self.x = x
         self.y = y
         self.color = color
-        self.size = random.randint(5, 12)  # Randomize initial size
-        self.speed = random.uniform(1.5, 2.5)  # Increase speed range for swifter movement
+        self.previous_y = y
+        self.size = int(rng.integers(5, 13))  # Randomize initial size
+        self.speed = rng.uniform(90, 150)  # Pixels per second, for swifter movement
         self.alpha = 255  # Initial transparency
+        self.fade_rate = 60  # Alpha units per second, for longer lasting particles
+
+    def move(self, dt):
+        """Advances the particle by dt seconds."""
+        self.previous_y = self.y
+        self.y -= self.speed * dt  # Use speed for movement
+        self.alpha = max(0.0, min(255.0, self.alpha - self.fade_rate * dt))
+
+    def blit_args(self, interpolation=1.0, sprites=None):
+        """Returns the (sprite, position) to blit for this particle, or None once it has faded out."""
+        if self.size <= 0 or self.alpha <= 0:
+            return None
+        sprites = sprites if sprites is not None else sprite_cache
+        y = self.previous_y + (self.y - self.previous_y) * interpolation
+        sprite = sprites.get(self.size, self.color, self.alpha)
+        return sprite, (self.x - self.size, y - self.size)
+
+    def draw(self, screen, interpolation=1.0, sprites=None):
+        args = self.blit_args(interpolation, sprites)
+        if args is not None:  # Only draw the particle if it hasn't faded out
+            screen.blit(*args)
 
-    def move(self):
-        self.y -= self.speed  # Use speed for movement
-        self.alpha = max(0, min(255, int(self.alpha - 1)))  # Decrease transparency more slowly for longer lasting particles
 
-    def draw(self, screen):
-        if self.size > 0:  # Only draw the particle if it hasn't faded out
-            surface = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)  # Create a new surface with alpha channel
-            pygame.draw.circle(surface, self.color + (self.alpha,), (self.size, self.size), self.size)  # Draw the particle on the surface
-            screen.blit(surface, (self.x - self.size, self.y - self.size))  # Blit the surface onto the screen
+class SpriteCache:
+    """
+    A bounded LRU cache of pre-rendered particle sprites.
+
+    Sprites are keyed by (size, color, alpha), with the alpha quantized to
+    alpha_levels steps, so fading particles reuse a small set of surfaces instead of
+    allocating and rasterizing a new one per particle per frame.
+    """
+
+    def __init__(self, max_sprites=MAX_SPRITES, alpha_levels=SPRITE_ALPHA_LEVELS):
+        self.max_sprites = max_sprites
+        self.alpha_levels = alpha_levels
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sprites = OrderedDict()
+
+    def get(self, size, color, alpha):
+        """Returns the sprite of a circle of radius size, rendering it on first use."""
+        level = int(alpha * (self.alpha_levels - 1) / 255 + 0.5)
+        key = (size, color, level)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self._sprites.move_to_end(key)
+            return sprite
+        self.misses += 1
+        sprite = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)  # Create a new surface with alpha channel
+        quantized_alpha = level * 255 // (self.alpha_levels - 1)
+        pygame.draw.circle(sprite, color + (quantized_alpha,), (size, size), size)  # Draw the particle on the surface
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+            self.evictions += 1
+        return sprite
+
+    def stats(self):
+        """Returns a dictionary with the cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "sprites": len(self._sprites),
+            "max_sprites": self.max_sprites,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared sprite cache used by Particle.draw and render_scene
+sprite_cache = SpriteCache()
 
 def init_pygame(display=(1600, 900)):
     pygame.init()
-    pygame.display.set_mode(display)
+    pygame.display.set_mode(display, pygame.RESIZABLE)
     pygame.display.set_caption("Pygame Music Visualizer")
     pygame.time.set_timer(pygame.USEREVENT, 1000 // 60)
 
-def generate_wave(note, duration=1.0, volume=0.5, sample_rate=44100):
-    frequency = 440 * 2 ** ((note - 69) / 12)
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
+def generate_wave(note, duration=1.0, volume=0.5, sample_rate=44100, waveform=NOTE_WAVEFORM,
+                  attack_time=NOTE_ENVELOPE["attack_time"], decay_time=NOTE_ENVELOPE["decay_time"],
+                  sustain_level=NOTE_ENVELOPE["sustain_level"],
+                  release_time=NOTE_ENVELOPE["release_time"]):
+    """Renders a note, or a chord when note is a list, from the shared wavetables."""
+    num_samples = int(sample_rate * duration)
 
-    # Creating an ADSR envelope
-    attack_time = 0.01
-    decay_time = 0.1
-    sustain_level = 0.7
-    release_time = 0.2
-    sustain_time = duration - attack_time - decay_time - release_time
+    # Short notes scale the stages down to fit, like music.synth.render_chord
+    if duration < attack_time + decay_time + release_time:
+        attack_time = duration * 0.1
+        decay_time = duration * 0.1
+        release_time = duration * 0.1
+    sustain_time = max(0.0, duration - attack_time - decay_time - release_time)
 
+    # Creating an ADSR envelope
     envelope = np.concatenate([
         np.linspace(0, 1, int(sample_rate * attack_time)),  # Attack
         np.linspace(1, sustain_level, int(sample_rate * decay_time)),  # Decay
@@ -83,60 +185,314 @@ def generate_wave(note, duration=1.0, volume=0.5, sample_rate=44100):
         np.linspace(sustain_level, 0, int(sample_rate * release_time))  # Release
     ])
 
-    envelope = np.pad(envelope, (0, max(0, len(t) - len(envelope))), 'constant')
+    envelope = np.pad(envelope, (0, max(0, num_samples - len(envelope))), 'constant')[:num_samples]
+
+    if get_wavetable is None:
+        frequencies = 440 * 2 ** ((np.atleast_1d(note) - 69) / 12)
+        t = np.arange(num_samples) / sample_rate
+        oscillator = np.sin(2 * np.pi * frequencies[:, None] * t).mean(axis=0)
+    elif isinstance(note, list):
+        oscillator, _ = get_wavetable(waveform).render_mix(
+            midi_to_frequency(note), num_samples, sample_rate)
+        oscillator /= len(note)
+    else:
+        oscillator, _ = get_wavetable(waveform).render(
+            midi_to_frequency(note), num_samples, sample_rate)
 
-    wave = 0.5 * np.sin(frequency * 2 * np.pi * t) * envelope * volume
+    wave = 0.5 * oscillator * envelope * volume
     return (wave * 32767).astype(np.int16)
 
-def play_wave(note, duration=1.0, volume=0.5, sample_rate=44100):
-    wave = generate_wave(note, duration, volume, sample_rate)
+def to_stereo(wave):
+    """Duplicates a mono int16 wave into an interleaved (samples, 2) array."""
     stereo_wave = np.zeros((wave.size, 2), dtype=np.int16)
     stereo_wave[:, 0] = wave
     stereo_wave[:, 1] = wave
+    return stereo_wave
+
+def init_mixer(sample_rate=44100):
+    """
+    Opens the mixer for 16-bit stereo at sample_rate, the layout of the Sound buffers.
+
+    pygame.init() opens the mixer with SDL free to pick the device's rate and channel
+    count, so a mixer with other settings is reopened, with SDL converting instead.
+
+    Raises:
+        RuntimeError: If the mixer cannot be opened with these settings.
+    """
+    settings = (sample_rate, -16, 2)
+    if pygame.mixer.get_init() not in (None, settings):
+        pygame.mixer.quit()
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(*settings, allowedchanges=0)
+    if pygame.mixer.get_init() != settings:
+        raise RuntimeError(f"Could not open the mixer as {settings}, got {pygame.mixer.get_init()}")
+
+def make_sound(note, duration=1.0, volume=0.5, sample_rate=44100):
+    wave = generate_wave(note, duration, volume, sample_rate)
+    return pygame.mixer.Sound(buffer=to_stereo(wave).tobytes())
+
+def play_wave(note, duration=1.0, volume=0.5, sample_rate=44100):
+    init_mixer(sample_rate)
+    make_sound(note, duration, volume, sample_rate).play()
+
+
+class SoundBank:
+    """
+    Ready-to-play Sounds for every playable note, played on a fixed pool of channels.
+
+    start initializes the mixer once and loads the notes on a background thread
+    (inline where threads are unavailable, as in the browser build), so playing a
+    note is a dictionary lookup and Channel.play. The waves come from the on-disk
+    sample bank, which is built on the first run and memory-mapped afterwards. A
+    note requested before the thread has reached it is rendered on the spot. When
+    every channel is busy, the channel that started playing longest ago is stolen.
+    """
 
-    pygame.mixer.init(sample_rate, -16, 2)
-    wave_bytes = stereo_wave.tobytes()
-    sound = pygame.mixer.Sound(buffer=wave_bytes)
-    sound.play()
+    def __init__(self, notes, duration=1.0, volume=0.5, sample_rate=44100,
+                 channels=MIXER_CHANNELS):
+        self.notes = sorted(set(notes))
+        self.duration = duration
+        self.volume = volume
+        self.sample_rate = sample_rate
+        self.num_channels = channels
+        self.sounds = {}
+        self.channels = []
+        self.started_at = []
+        self.plays = 0
+        self.steals = 0
+        self.on_demand = 0
+        self.thread = None
 
-async def handle_keydown(event, keys_being_pressed, particles, key_positions):
+    def start(self, background=True):
+        init_mixer(self.sample_rate)
+        pygame.mixer.set_num_channels(self.num_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.num_channels)]
+        self.started_at = [0] * self.num_channels
+        if background and sys.platform != "emscripten":
+            self.thread = threading.Thread(target=self._render_all, daemon=True)
+            self.thread.start()
+        else:
+            self._render_all()
+
+    def _render_all(self):
+        waves = None
+        try:
+            if open_bank is not None:
+                # Every synthesis setting is part of the bank's key, so changing
+                # one builds a new bank instead of mapping stale notes
+                waves = open_bank("AudioVisualSynth", self.notes, generate_wave, {
+                    "duration": self.duration, "volume": self.volume,
+                    "sample_rate": self.sample_rate, "waveform": NOTE_WAVEFORM,
+                    **NOTE_ENVELOPE})
+        except OSError as e:
+            print(f"Sample bank unavailable ({e}), notes will be synthesized")
+        for note in self.notes:
+            if note not in self.sounds:
+                if waves is not None:
+                    wave = to_stereo(waves.get(note))
+                    self.sounds[note] = pygame.mixer.Sound(buffer=wave.tobytes())
+                else:
+                    self.sounds[note] = self._render(note)
+
+    def _render(self, note):
+        return make_sound(note, self.duration, self.volume, self.sample_rate)
+
+    @property
+    def ready(self):
+        return len(self.sounds) >= len(self.notes)
+
+    def _free_channel(self):
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        self.steals += 1
+        return min(range(len(self.channels)), key=self.started_at.__getitem__)
+
+    def play(self, note):
+        sound = self.sounds.get(note)
+        if sound is None:
+            self.on_demand += 1
+            sound = self.sounds[note] = self._render(note)
+        index = self._free_channel()
+        self.plays += 1
+        self.started_at[index] = self.plays
+        self.channels[index].play(sound)
+
+    def stats(self):
+        return {
+            "ready": len(self.sounds),
+            "notes": len(self.notes),
+            "plays": self.plays,
+            "steals": self.steals,
+            "on_demand": self.on_demand,
+        }
+
+async def handle_keydown(event, keys_being_pressed, particles, key_positions, rng=None,
+                         bank=None):
     if event.key in key_to_note and event.key not in keys_being_pressed:
         current_note = key_to_note[event.key]
         keys_being_pressed[event.key] = current_note
         color = note_to_color.get(current_note, (255, 255, 255))
         position = key_positions[current_note]
-        particles.append(Particle(position[0], position[1], color))
-        play_wave(current_note)
+        particles.append(Particle(position[0], position[1], color, rng))
+        if bank is not None:
+            bank.play(current_note)
+        else:
+            play_wave(current_note)
 
 async def handle_keyup(event, keys_being_pressed):
     if event.key in keys_being_pressed:
         del keys_being_pressed[event.key]
 
-def render_scene(screen, particles, key_positions, keys_being_pressed):
-    screen.fill((30, 30, 30))
+def render_scene(screen, particles, key_positions, keys_being_pressed, interpolation=1.0,
+                 sprites=None):
+    """Redraws the whole frame and flips it. SceneRenderer only redraws what changed."""
+    screen.fill(BACKGROUND_COLOR)
     draw_piano_keys(screen, key_positions, keys_being_pressed)
-    for particle in particles:
-        particle.move()
-        particle.draw(screen)
+    # Blit every particle sprite in one call
+    blits = [particle.blit_args(interpolation, sprites) for particle in particles]
+    screen.blits([args for args in blits if args is not None], doreturn=False)
     pygame.display.flip()
 
-def draw_piano_keys(screen, key_positions, keys_being_pressed):
+def calculate_key_rects(display_width, key_positions):
+    """Returns the rect of every key, all as wide as a white key."""
     white_keys = [note for note in key_positions if note % 12 in [0, 2, 4, 5, 7, 9, 11]]
-    key_width = screen.get_width() // len(white_keys)
-
-    for note, (x, y) in key_positions.items():
-        color = note_to_color.get(note, (255, 255, 255))
-        key_rect = pygame.Rect(x - key_width // 2, y - 100, key_width, 100)
-        if note in keys_being_pressed.values():
-            # if key is black draw black color
-            if note % 12 in [1, 3, 6, 8, 10]:
-                pygame.draw.rect(screen, (0, 0, 0), key_rect)
-            else:
-                pygame.draw.rect(screen, (255, 255, 255), key_rect)
-        # if black key draw darker color
+    key_width = display_width // len(white_keys)
+    return {
+        note: pygame.Rect(x - key_width // 2, y - 100, key_width, 100)
+        for note, (x, y) in key_positions.items()
+    }
+
+def draw_key(surface, note, key_rect, pressed):
+    color = note_to_color.get(note, (255, 255, 255))
+    if pressed:
+        # if key is black draw black color
         if note % 12 in [1, 3, 6, 8, 10]:
-            color = tuple(int(c * 0.8) for c in color)
-        pygame.draw.rect(screen, color, key_rect, 5)
+            pygame.draw.rect(surface, (0, 0, 0), key_rect)
+        else:
+            pygame.draw.rect(surface, (255, 255, 255), key_rect)
+    # if black key draw darker color
+    if note % 12 in [1, 3, 6, 8, 10]:
+        color = tuple(int(c * 0.8) for c in color)
+    pygame.draw.rect(surface, color, key_rect, 5)
+
+def draw_piano_keys(screen, key_positions, keys_being_pressed):
+    pressed_notes = set(keys_being_pressed.values())
+    for note, key_rect in calculate_key_rects(screen.get_width(), key_positions).items():
+        draw_key(screen, note, key_rect, note in pressed_notes)
+
+
+class KeyHitTest:
+    """
+    Finds the key under a point in constant time.
+
+    The keys form two rows, the black keys above the white ones. Each row has a
+    lookup table with the note of every pixel column (-1 between keys), built once
+    from the key rects, so a hit test is a row check and a list index.
+    """
+
+    def __init__(self, display_width, key_rects):
+        self.rows = []
+        for is_black in (True, False):
+            rects = {note: rect for note, rect in key_rects.items()
+                     if (note % 12 in [1, 3, 6, 8, 10]) == is_black}
+            if not rects:
+                continue
+            columns = [-1] * display_width
+            for note, rect in rects.items():
+                for x in range(max(rect.left, 0), min(rect.right, display_width)):
+                    columns[x] = note
+            top = min(rect.top for rect in rects.values())
+            bottom = max(rect.bottom for rect in rects.values())
+            self.rows.append((top, bottom, columns))
+
+    def note_at(self, x, y):
+        """Returns the note of the key at (x, y), or None."""
+        for top, bottom, columns in self.rows:
+            if top <= y < bottom and 0 <= x < len(columns):
+                note = columns[x]
+                return note if note >= 0 else None
+        return None
+
+
+class KeyboardLayer:
+    """
+    The background and keyboard, pre-rendered once.
+
+    surface always shows the keyboard in its current pressed state. update only
+    redraws the keys whose state changed since the last call, from a copy of the
+    unpressed keyboard.
+    """
+
+    def __init__(self, size, key_positions):
+        self.key_rects = calculate_key_rects(size[0], key_positions)
+        self.base = pygame.Surface(size)
+        self.base.fill(BACKGROUND_COLOR)
+        for note, key_rect in self.key_rects.items():
+            draw_key(self.base, note, key_rect, False)
+        self.surface = self.base.copy()
+        self.pressed = frozenset()
+
+    def update(self, pressed_notes):
+        """Redraws the keys whose pressed state changed and returns their rects."""
+        pressed = frozenset(note for note in pressed_notes if note in self.key_rects)
+        changed = pressed ^ self.pressed
+        self.pressed = pressed
+        rects = [self.key_rects[note] for note in changed]
+        for key_rect in rects:
+            self.surface.blit(self.base, key_rect, key_rect)
+        # Restoring a rect may have covered part of a pressed neighbour, so redraw those too
+        for note in pressed:
+            if self.key_rects[note].collidelist(rects) != -1:
+                draw_key(self.surface, note, self.key_rects[note], True)
+        return rects
+
+
+class SceneRenderer:
+    """
+    Draws frames by updating only the screen areas that changed.
+
+    Each frame erases the particles of the previous frame and the keys that changed
+    by copying those areas back from the keyboard layer, blits the particles, and
+    pushes just those rectangles with pygame.display.update. The first frame, and
+    any frame with more than max_dirty_rects rectangles, is redrawn from the whole
+    keyboard layer and pushed with a full flip.
+    """
+
+    def __init__(self, screen, key_positions, sprites=None, max_dirty_rects=MAX_DIRTY_RECTS):
+        self.screen = screen
+        self.keyboard = KeyboardLayer(screen.get_size(), key_positions)
+        self.sprites = sprites
+        self.max_dirty_rects = max_dirty_rects
+        self.previous_rects = []
+        self.full_redraw = True
+        self.flips = 0
+        self.updates = 0
+
+    def invalidate(self):
+        """Makes the next frame a full redraw."""
+        self.full_redraw = True
+
+    def render(self, particles, keys_being_pressed, interpolation=1.0):
+        erased = self.previous_rects + self.keyboard.update(keys_being_pressed.values())
+        # Erasing many small rects costs more than copying the whole layer once
+        full_redraw = self.full_redraw or len(erased) > self.max_dirty_rects
+        if full_redraw:
+            self.screen.blit(self.keyboard.surface, (0, 0))
+        else:
+            for rect in erased:
+                self.screen.blit(self.keyboard.surface, rect, rect)
+        blits = [particle.blit_args(interpolation, self.sprites) for particle in particles]
+        rects = self.screen.blits([args for args in blits if args is not None])
+        dirty = erased + rects
+        if full_redraw or len(dirty) > self.max_dirty_rects:
+            pygame.display.flip()
+            self.flips += 1
+        else:
+            pygame.display.update(dirty)
+            self.updates += 1
+        self.previous_rects = rects
+        self.full_redraw = False
 
 def calculate_key_positions(display_width, display_height, note_to_color=note_to_color):
     key_positions = {}
@@ -158,7 +514,23 @@ def calculate_key_positions(display_width, display_height, note_to_color=note_to
             key_positions[note] = (x, display_height - 150 - black_key_height)
 
     return key_positions
-async def main_loop():
+def press_mouse_note(note, keys_being_pressed, particles, key_positions, rng=None, bank=None):
+    """Moves the mouse-held note to note, releasing the previous one, and plays it."""
+    if note is None:
+        keys_being_pressed.pop(MOUSE_KEY, None)
+        return
+    if keys_being_pressed.get(MOUSE_KEY) == note:
+        return
+    keys_being_pressed[MOUSE_KEY] = note
+    x, y = key_positions[note]
+    color = note_to_color.get(note, (255, 255, 255))
+    particles.append(Particle(x, y, color, rng))
+    if bank is not None:
+        bank.play(note)
+    else:
+        play_wave(note)
+
+async def main_loop(fps=FRAME_RATE, seed=None):
     display = (800, 800 // 16 * 9)
     init_pygame(display)
     screen = pygame.display.get_surface()
@@ -166,42 +538,82 @@ async def main_loop():
     running = True
     keys_being_pressed = {}
     key_positions = calculate_key_positions(display[0], display[1])
-    key_width = display[0] // len(note_to_color)
+    hit_test = KeyHitTest(display[0], calculate_key_rects(display[0], key_positions))
+    renderer = SceneRenderer(screen, key_positions)
+    # Particles move on a fixed timestep, whatever the frame rate
+    if SimulationClock is not None:
+        clock = SimulationClock()
+        pacer = FramePacer(fps)
+    else:
+        clock = pacer = None
+        frame_clock = pygame.time.Clock()
+    # A fixed seed replays the same particles, for comparable benchmark runs
+    rng = np.random.default_rng(seed)
+    bank = SoundBank(set(key_to_note.values()) | set(note_to_color))
+    bank.start()
 
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
-                await handle_keydown(event, keys_being_pressed, particles, key_positions)
+                await handle_keydown(event, keys_being_pressed, particles, key_positions, rng,
+                                     bank)
             elif event.type == pygame.KEYUP:
                 await handle_keyup(event, keys_being_pressed)
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                note = mouse_x // key_width + 48  # Calculate the base note assuming it's a white key
-                black_key_height = display[1] - 150 - 100  # Height of the black keys
-                # Determine if the note is a black key based on its position in the scale
-                if note % 12 in [1, 3, 6, 8, 10]:  # These are the positions of black keys in an octave
-                    # Check if the mouse click was within the height range of black keys
-                    if mouse_y <= black_key_height:
-                        # It's a black key, and the click was within the black key's height
-                        pass  # The note is correctly set
-                    else:
-                        # The click was outside the black key's height, adjust the note for a white key
-                        # This logic might need adjustment based on the specific layout of your piano keys
-                        note -= 1 if note % 12 in [1, 3] else 1
-                # If the note is not a black key, no adjustment is needed based on mouse_y
-
-                if note in key_positions:
-                    keys_being_pressed[0] = note
-                    x, y = key_positions[note]
-                    color = note_to_color.get(note, (255, 255, 255))
-                    particles.append(Particle(x, y, color))
-                    play_wave(note)
-        render_scene(screen, particles, key_positions, keys_being_pressed)
-        await asyncio.sleep(0)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                press_mouse_note(hit_test.note_at(*event.pos), keys_being_pressed,
+                                 particles, key_positions, rng, bank)
+            elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                # Dragging across the keys plays each one it enters (glissando)
+                press_mouse_note(hit_test.note_at(*event.pos), keys_being_pressed,
+                                 particles, key_positions, rng, bank)
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                keys_being_pressed.pop(MOUSE_KEY, None)
+            elif event.type == pygame.VIDEORESIZE:
+                display = event.size
+                screen = pygame.display.get_surface()
+                key_positions = calculate_key_positions(display[0], display[1])
+                hit_test = KeyHitTest(display[0], calculate_key_rects(display[0], key_positions))
+                renderer = SceneRenderer(screen, key_positions)
+        if clock is None:
+            # Without the shared timing module, move by the last frame's duration
+            dt = frame_clock.tick(fps) / 1000
+            for particle in particles:
+                particle.move(dt)
+        else:
+            for _ in range(clock.tick()):
+                for particle in particles:
+                    particle.move(clock.step)
+        # Drop the particles that have faded out or left the screen
+        particles[:] = [particle for particle in particles
+                        if particle.alpha > 0 and particle.y + particle.size > 0]
+        if clock is None:
+            renderer.render(particles, keys_being_pressed)
+            await asyncio.sleep(0)
+        else:
+            if pacer.should_render():
+                renderer.render(particles, keys_being_pressed, clock.interpolation)
+            await asyncio.sleep(pacer.delay())
 
+    stats = sprite_cache.stats()
+    print(f"Sprite cache: {stats['sprites']} sprites, hit rate {stats['hit_rate']:.1%}; "
+          f"{renderer.updates} partial updates, {renderer.flips} full flips")
+    bank_stats = bank.stats()
+    print(f"Sound bank: {bank_stats['plays']} notes played, {bank_stats['steals']} voices stolen, "
+          f"{bank_stats['on_demand']} rendered on demand")
     pygame.quit()
 
 # This is the program entry point:
-asyncio.run(main_loop())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pygame music visualizer.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed the particle effects so runs are reproducible")
+    parser.add_argument("--fps", type=float, default=FRAME_RATE,
+                        help=f"The target frame rate (default {FRAME_RATE})")
+    # The browser build may pass arguments of its own; elsewhere unknown ones are errors
+    if sys.platform == "emscripten":
+        args, _ = parser.parse_known_args()
+    else:
+        args = parser.parse_args()
+    asyncio.run(main_loop(args.fps, args.seed))
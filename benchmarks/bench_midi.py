@@ -0,0 +1,155 @@
+"""
+MIDI reader throughput benchmark.
+
+Writes synthetic Standard MIDI Files of increasing size into a temporary directory
+and measures, per file:
+    read_events: Note events parsed per second, tempo map included.
+    read_notes: Notes paired per second.
+
+Each file spreads its notes over several tracks with running status and tempo
+changes, like an exported arrangement. The peak traced memory of each reader is
+reported too; it should stay flat as the files grow, since the reader streams.
+
+Usage:
+    python -m benchmarks.bench_midi --output midi.json
+    python -m benchmarks.bench_midi --notes 10000 1000000 --tracks 16
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from music.midi import read_events, read_notes
+
+NOTE_COUNTS = (10000, 100000, 1000000)
+TRACKS = 8
+TICKS_PER_QUARTER = 480
+TEMPO_CHANGE_EVERY = 64  # Quarter notes
+
+
+def _varlen(value):
+    encoded = [value & 0x7F]
+    value >>= 7
+    while value:
+        encoded.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(encoded))
+
+
+def _chunk(chunk_type, body):
+    return chunk_type + len(body).to_bytes(4, "big") + body
+
+
+def write_test_file(path, notes, tracks=TRACKS, seed=0):
+    """Writes a format 1 file with notes spread over tracks, track 0 holding the tempo map."""
+    rng = np.random.default_rng(seed)
+    per_track = notes // tracks
+    tempo_map = bytearray()
+    # Every note starts on a quarter note, so a track lasts per_track quarter notes
+    for quarter in range(0, per_track, TEMPO_CHANGE_EVERY):
+        delta = TEMPO_CHANGE_EVERY * TICKS_PER_QUARTER if quarter else 0
+        tempo = int(rng.integers(400000, 700000))
+        tempo_map += _varlen(delta) + b"\xff\x51\x03" + tempo.to_bytes(3, "big")
+    chunks = [_chunk(b"MTrk", bytes(tempo_map) + b"\x00\xff\x2f\x00")]
+    for track in range(1, tracks + 1):
+        channel = (track - 1) % 16
+        pitches = rng.integers(36, 96, per_track)
+        velocities = rng.integers(40, 128, per_track)
+        lengths = rng.choice([120, 240, 480], per_track)
+        body = bytearray()
+        previous_off = 0
+        for pitch, velocity, length in zip(pitches.tolist(), velocities.tolist(), lengths.tolist()):
+            # Running status: a note-off is a note-on of velocity 0
+            status = b"" if body else bytes([0x90 | channel])
+            body += _varlen(previous_off) + status + bytes([pitch, velocity])
+            body += _varlen(length) + bytes([pitch, 0])
+            previous_off = TICKS_PER_QUARTER - length
+        body += b"\x00\xff\x2f\x00"
+        chunks.append(_chunk(b"MTrk", bytes(body)))
+    header = _chunk(b"MThd", (1).to_bytes(2, "big") + len(chunks).to_bytes(2, "big")
+                    + TICKS_PER_QUARTER.to_bytes(2, "big"))
+    with open(path, "wb") as file:
+        file.write(header + b"".join(chunks))
+
+
+def measure(function, path):
+    """
+    Counts the items yielded by function(path), returning (count, seconds, peak bytes).
+
+    The memory is traced in a second pass, since tracing slows the parser down.
+    """
+    start = time.perf_counter()
+    count = sum(1 for _ in function(path))
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    for _ in function(path):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def run_case(notes, tracks, directory, seed=0):
+    path = os.path.join(directory, f"bench-{notes}.mid")
+    write_test_file(path, notes, tracks, seed)
+    result = {"notes": notes, "tracks": tracks, "file_bytes": os.path.getsize(path)}
+    for name, function in (("read_events", read_events), ("read_notes", read_notes)):
+        count, elapsed, peak = measure(function, path)
+        result[name] = {
+            "items": count,
+            "seconds": elapsed,
+            "items_per_second": count / elapsed if elapsed else float("inf"),
+            "peak_memory_bytes": peak,
+        }
+    os.remove(path)
+    return result
+
+
+def run(note_counts, tracks, seed=0):
+    with tempfile.TemporaryDirectory() as directory:
+        results = {f"notes={notes}": run_case(notes, tracks, directory, seed)
+                   for notes in note_counts}
+    return {
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "tracks": tracks,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def print_results(results):
+    for key, result in results["results"].items():
+        events, notes = result["read_events"], result["read_notes"]
+        print(f"{key:<16} {result['file_bytes'] / 2**20:>7.1f} MiB "
+              f"{events['items_per_second']:>12,.0f} events/s "
+              f"{notes['items_per_second']:>12,.0f} notes/s "
+              f"peak memory {max(events['peak_memory_bytes'], notes['peak_memory_bytes']) / 2**10:.0f} KiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MIDI file reader.")
+    parser.add_argument("--notes", type=int, nargs="+", default=NOTE_COUNTS,
+                        help="The note counts of the generated files")
+    parser.add_argument("--tracks", type=int, default=TRACKS,
+                        help="The number of note tracks per file")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated notes")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.notes, args.tracks, args.seed)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
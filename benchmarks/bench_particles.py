@@ -0,0 +1,109 @@
+"""
+Headless particle update and draw benchmark.
+
+Runs the render_scene frame loop (rotate, clear, move, draw, flip) on a NullBackend,
+so no display or OpenGL context is needed, and compares the renderer strategies:
+    batch: SphereBatchRenderer, every particle in one indexed draw call.
+    immediate: ImmediateSphereRenderer, one glutSolidSphere per particle.
+
+The pool is topped up with bursts before every frame so it stays full at each
+particle count. Reported per frame: CPU milliseconds (mean, p50, p95), draw calls,
+vertices, state changes and backend calls, i.e. Python to OpenGL transitions.
+
+Usage:
+    python -m benchmarks.bench_particles --output particles.json
+    python -m benchmarks.bench_particles --counts 256 1024 --frames 50
+"""
+
+import argparse
+import json
+import platform
+import sys
+
+import numpy as np
+from music.graphics.backend import NullBackend
+from music.graphics.particles import ParticleSystem, update_particles
+from music.graphics.renderer import ImmediateSphereRenderer, SphereBatchRenderer
+
+COUNTS = (64, 256, 1024, 4096)
+FRAMES = 200
+WARMUP_FRAMES = 10
+
+RENDERERS = {
+    "batch": SphereBatchRenderer,
+    "immediate": ImmediateSphereRenderer,
+}
+
+
+def top_up(system, rng):
+    """Emits bursts until the pool is full."""
+    while system.live_count < system.capacity:
+        system.emit(rng.uniform(-1, 1), rng.uniform(-1, 1), 0, int(rng.integers(48, 85)))
+
+
+def run_case(renderer_name, count, frames, seed=0):
+    """Runs one case. The same seed gives every renderer the same particles."""
+    rng = np.random.default_rng(seed)
+    backend = NullBackend()
+    system = ParticleSystem(capacity=count, renderer=RENDERERS[renderer_name](backend=backend),
+                            rng=seed)
+    for frame in range(WARMUP_FRAMES + frames):
+        if frame == WARMUP_FRAMES:
+            backend.reset()
+        top_up(system, rng)
+        backend.begin_frame()
+        backend.rotate(1, 3, 1, 1)
+        backend.clear()
+        update_particles(system, backend)
+        backend.end_frame()
+    return dict(backend.stats(), renderer=renderer_name, particles=count)
+
+
+def run(counts, frames, renderers=tuple(RENDERERS), seed=0):
+    results = {}
+    for count in counts:
+        for name in renderers:
+            results[f"{name}[particles={count}]"] = run_case(name, count, frames, seed)
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "frames": frames,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def print_results(results):
+    for key, result in results["results"].items():
+        print(f"{key:<28} {result['frame_ms_mean']:>8.3f} ms/frame "
+              f"(p95 {result['frame_ms_p95']:.3f}) "
+              f"{result['draw_calls_per_frame']:>7.0f} draws "
+              f"{result['vertices_per_frame']:>9.0f} vertices "
+              f"{result['state_changes_per_frame']:>7.0f} state changes "
+              f"{result['calls_per_frame']:>7.0f} calls")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the particle update and draw loop.")
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS,
+                        help="The particle counts to run")
+    parser.add_argument("--frames", type=int, default=FRAMES,
+                        help="The number of measured frames per case")
+    parser.add_argument("--renderers", nargs="+", choices=sorted(RENDERERS),
+                        default=list(RENDERERS), help="The renderer strategies to compare")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the particle workload (default 0)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.counts, args.frames, args.renderers, args.seed)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
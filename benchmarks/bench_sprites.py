@@ -0,0 +1,138 @@
+"""
+Frame rate benchmark of the AudioVisualSynth 2D front-end.
+
+Renders frames of the visualizer with the SDL dummy video driver, so no display is
+needed, and compares three ways of drawing a frame:
+    surface: The previous Particle.draw, a new SRCALPHA surface and a circle
+        rasterized per particle per frame, over a fully redrawn keyboard.
+    atlas: render_scene, sprites from the SpriteCache blitted with one screen.blits
+        call, over a fully redrawn keyboard.
+    dirty: SceneRenderer, the cached keyboard layer and the same sprites, pushing
+        only the changed rectangles.
+
+Particles are spawned over the keyboard and moved on the fixed simulation step, with
+the pool topped up so it holds the requested count. Reported per case: frames per
+second, milliseconds per frame, the sprite cache hit rate and, for dirty, how many
+frames were pushed as partial updates or full flips.
+
+Usage:
+    python -m benchmarks.bench_sprites --counts 100 1000 5000 --output sprites.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from AudioVisualSynth.main import (
+    Particle, SceneRenderer, SpriteCache, calculate_key_positions, draw_piano_keys,
+    note_to_color, render_scene,
+)
+
+COUNTS = (0, 100, 1000, 5000)
+STRATEGIES = ("surface", "atlas", "dirty")
+FRAMES = 120
+DISPLAY = (800, 800 // 16 * 9)
+STEP = 1 / 100
+
+
+def render_uncached(screen, particles, key_positions, keys_being_pressed):
+    """The previous render_scene: one new surface per particle per frame."""
+    screen.fill((30, 30, 30))
+    draw_piano_keys(screen, key_positions, keys_being_pressed)
+    for particle in particles:
+        if particle.size > 0:
+            surface = pygame.Surface((particle.size * 2, particle.size * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, particle.color + (int(particle.alpha),),
+                               (particle.size, particle.size), particle.size)
+            screen.blit(surface, (particle.x - particle.size, particle.y - particle.size))
+    pygame.display.flip()
+
+
+def run_case(strategy, count, frames, screen, key_positions, seed=0):
+    rng = np.random.default_rng(seed)
+    notes = sorted(key_positions)
+    sprites = SpriteCache()
+    renderer = SceneRenderer(screen, key_positions, sprites)
+    particles = []
+    start = None
+    for frame in range(frames + 1):
+        if frame == 1:  # The first frame only warms up
+            start = time.perf_counter()
+        particles = [particle for particle in particles if particle.alpha > 0]
+        while len(particles) < count:
+            note = notes[int(rng.integers(len(notes)))]
+            x, y = key_positions[note]
+            particles.append(Particle(x, y, note_to_color[note], rng))
+        for particle in particles:
+            particle.move(STEP)
+        if strategy == "dirty":
+            renderer.render(particles, {})
+        elif strategy == "atlas":
+            render_scene(screen, particles, key_positions, {}, sprites=sprites)
+        else:
+            render_uncached(screen, particles, key_positions, {})
+    elapsed = time.perf_counter() - start
+    result = {
+        "strategy": strategy,
+        "particles": count,
+        "fps": frames / elapsed,
+        "frame_ms": elapsed / frames * 1000,
+    }
+    if strategy != "surface":
+        result["sprite_cache"] = sprites.stats()
+    if strategy == "dirty":
+        result["partial_updates"] = renderer.updates
+        result["full_flips"] = renderer.flips
+    return result
+
+
+def run(counts, frames, seed=0):
+    pygame.init()
+    screen = pygame.display.set_mode(DISPLAY)
+    key_positions = calculate_key_positions(*DISPLAY)
+    results = {}
+    for count in counts:
+        for strategy in STRATEGIES:
+            results[f"{strategy}[particles={count}]"] = run_case(
+                strategy, count, frames, screen, key_positions, seed)
+    pygame.quit()
+    return {"pygame": pygame.version.ver, "frames": frames, "seed": seed, "results": results}
+
+
+def print_results(results):
+    for key, result in results["results"].items():
+        line = f"{key:<26} {result['fps']:>8.1f} fps {result['frame_ms']:>8.2f} ms/frame"
+        if "sprite_cache" in result and result["particles"]:
+            line += f"  hit rate {result['sprite_cache']['hit_rate']:.1%}"
+        if "full_flips" in result:
+            line += f"  {result['partial_updates']} partial updates, {result['full_flips']} flips"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the 2D particle drawing.")
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS,
+                        help="The particle counts to run")
+    parser.add_argument("--frames", type=int, default=FRAMES,
+                        help="The number of measured frames per case")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the particles")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.counts, args.frames, args.seed)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
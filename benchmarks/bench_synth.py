@@ -0,0 +1,175 @@
+"""
+Synthesis micro-benchmarks for music.synth and AudioVisualSynth.
+
+Measures notes per second and nanoseconds per output sample for:
+    generate_single_note: A freshly synthesized note (cache bypassed) and a cached one.
+    generate_note: Chords of 1 to 8 notes (cache bypassed).
+    generate_wave: The AudioVisualSynth note renderer.
+    to_stereo: The mono to stereo conversion of AudioVisualSynth.play_wave.
+
+Every case runs over a grid of durations and sample rates. No audio device or display
+is used. Results are written as JSON and can be compared against a saved baseline;
+the exit status is 1 when any case is slower than the baseline by more than the
+threshold.
+
+Usage:
+    python -m benchmarks.bench_synth --output results.json
+    python -m benchmarks.bench_synth --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_synth --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+from music.cache import NoteCache
+from music.synth import generate_note, generate_single_note
+from AudioVisualSynth.main import generate_wave, to_stereo
+
+DURATIONS = (0.1, 0.5, 1.0, 2.0)
+SAMPLE_RATES = (22050, 44100, 48000)
+CHORD_SIZES = range(1, 9)
+QUICK_DURATIONS = (0.5,)
+QUICK_SAMPLE_RATES = (44100,)
+MIN_TIME = 0.2  # Seconds spent on each case
+REPEATS = 5
+
+
+def measure(function, min_time=MIN_TIME, repeats=REPEATS):
+    """
+    Time function, returning the best per-call time in seconds.
+
+    The call count is calibrated so one repeat lasts about min_time / repeats, and the
+    fastest repeat is kept to filter out scheduler noise.
+    """
+    function()  # Warm up tables and caches
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        calls *= 2
+    best = elapsed / calls
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def benchmark_cases(durations, sample_rates):
+    """Yields (name, parameters, function, samples per call) for every case in the grid."""
+    cached = NoteCache()
+    for sample_rate in sample_rates:
+        for duration in durations:
+            samples = int(duration * sample_rate)
+            params = {"duration": duration, "sample_rate": sample_rate}
+            yield ("generate_single_note", params,
+                   lambda d=duration, sr=sample_rate: generate_single_note(
+                       64, d, sample_rate=sr, cache=None), samples)
+            yield ("generate_single_note_cached", params,
+                   lambda d=duration, sr=sample_rate: generate_single_note(
+                       64, d, sample_rate=sr, cache=cached), samples)
+            for size in CHORD_SIZES:
+                chord = list(range(60, 60 + 3 * size, 3))
+                yield ("generate_note", dict(params, chord_size=size),
+                       lambda c=chord, d=duration, sr=sample_rate: generate_note(
+                           c, d, sample_rate=sr, cache=None), samples)
+            yield ("generate_wave", params,
+                   lambda d=duration, sr=sample_rate: generate_wave(64, d, sample_rate=sr),
+                   samples)
+            wave = generate_wave(64, duration, sample_rate=sample_rate)
+            yield ("to_stereo", params, lambda w=wave: to_stereo(w), samples)
+
+
+def case_key(name, params):
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def run(durations, sample_rates, min_time=MIN_TIME):
+    results = {}
+    for name, params, function, samples in benchmark_cases(durations, sample_rates):
+        seconds = measure(function, min_time)
+        results[case_key(name, params)] = dict(
+            params,
+            name=name,
+            seconds_per_call=seconds,
+            notes_per_second=1 / seconds,
+            ns_per_sample=seconds / samples * 1e9,
+        )
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns the regressions as (case, baseline ns/sample, current ns/sample, change)."""
+    regressions = []
+    for key, current in results["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        change = current["ns_per_sample"] / previous["ns_per_sample"] - 1
+        if change > threshold:
+            regressions.append((key, previous["ns_per_sample"], current["ns_per_sample"], change))
+    return regressions
+
+
+def print_results(results):
+    for key, result in results["results"].items():
+        print(f"{key:<70} {result['notes_per_second']:>12.1f} notes/s "
+              f"{result['ns_per_sample']:>10.2f} ns/sample")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the note synthesis paths.")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this saved results file")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="Write the results to PATH for later comparisons")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed slowdown in ns/sample before failing (default 0.15)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="Seconds spent on each case")
+    parser.add_argument("--quick", action="store_true",
+                        help="Only run 0.5 s notes at 44.1 kHz")
+    args = parser.parse_args(argv)
+
+    durations = QUICK_DURATIONS if args.quick else DURATIONS
+    sample_rates = QUICK_SAMPLE_RATES if args.quick else SAMPLE_RATES
+    results = run(durations, sample_rates, args.min_time)
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for key, previous, current, change in regressions:
+            print(f"REGRESSION {key}: {previous:.2f} -> {current:.2f} ns/sample (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,7 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import numpy as np
+from music.graphics.backend import default_backend
 
 # Define the vertices for two intersecting tetrahedrons
 UPWARD_PYRAMID_VERTICES = np.array(
@@ -37,12 +38,9 @@ DOWNWARD_PYRAMID_VERTICES = np.array(
 TRIANGLES = [(0, 1, 2), (0, 1, 3), (0, 2, 3), (1, 2, 3)]
 
 
-def draw_pyramid(vertices):
-    glBegin(GL_TRIANGLES)
-    for triangle in TRIANGLES:
-        for vertex in triangle:
-            glVertex3fv(vertices[vertex])
-    glEnd()
+def draw_pyramid(vertices, backend=None):
+    backend = backend or default_backend()
+    backend.triangles(vertices[np.array(TRIANGLES).ravel()])
 
 
 def setup_scene():
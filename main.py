@@ -1,69 +1,105 @@
 """
 This module initializes an OpenGL window using Pygame and handles
 keyboard inputs to play musical notes and create visual effects with particles.
-It utilizes the simpleaudio library for sound generation and playback,
-and custom modules for musical notes and color mappings.
+Notes are mixed by the shared audio engine, and custom modules provide
+the musical notes and color mappings.
 """
 
-import simpleaudio as sa
+import argparse
 import pygame
-from music.graphics.particles import Particle, render_scene
-from music.music import generate_and_play_note
+from music.graphics.particles import ParticleSystem, ParticleScene
+from music.graphics.timing import FramePacer
+from music.graphics.quality import QualityGovernor, frame_budget_ms
+from music.engine import get_engine, shutdown_engine
+from music.latency import LatencyTracker
 from music.graphics.notes_color import key_to_note
 from music.graphics.init import init_pygame
 
 
-def handle_keydown(event, keys_being_pressed, note_generators, particles):
+LATENCY_REPORT_KEY = pygame.K_F12
+# Frames are paced at 100 fps so keys are polled at least every 10 ms
+FRAME_RATE = 100
+
+
+def handle_keydown(event, keys_being_pressed, note_generators, particles, latency=None):
     """Handles keydown events to play notes and generate particles."""
+    if event.key == LATENCY_REPORT_KEY and latency is not None:
+        print(latency.report())
     if event.key in key_to_note and event.key not in keys_being_pressed:
-        play_note(event, keys_being_pressed, note_generators)
-        particles.append(Particle(0, 0, 0, key_to_note[event.key]))
+        trace = latency.start(key_to_note[event.key]) if latency is not None else None
+        play_note(event, keys_being_pressed, note_generators, trace)
+        particles.emit(0, 0, 0, key_to_note[event.key])
 
 
-def play_note(event, keys_being_pressed, note_generators):
-    """Generates and plays a note based on the key pressed."""
+def play_note(event, keys_being_pressed, note_generators, trace=None):
+    """Starts a streaming voice for the key pressed; it sounds until the key is released."""
     current_note = [key_to_note[event.key]]
     keys_being_pressed[event.key] = current_note
     note_settings = {
         "attack_time": 0.1,
         "decay_time": 0.1,
         "release_time": 0.1,
-        "duration": 0.7
     }
-    if pygame.key.get_pressed()[pygame.K_SPACE]:
-        note_settings["duration"] *= 2
-    note_samples = generate_and_play_note(
-        current_note[0], **note_settings)
-    note_generators[event.key] = sa.play_buffer(note_samples, 1, 2, 44100)
+    note_generators[event.key] = get_engine().note_on(
+        current_note[0], trace=trace, **note_settings)
 
 
-def handle_keyup(event, keys_being_pressed):
-    """Cleans up resources after a key is released."""
+def handle_keyup(event, keys_being_pressed, note_generators=None, sustained_voices=None):
+    """Releases the note of the key, or holds it while space (the sustain pedal) is down."""
+    if sustained_voices is None:
+        sustained_voices = []
+    if event.key == pygame.K_SPACE:
+        for voice in sustained_voices:
+            voice.release()
+        sustained_voices.clear()
     if event.key in keys_being_pressed:
         del keys_being_pressed[event.key]
+        voice = note_generators.pop(event.key, None) if note_generators else None
+        if voice is not None:
+            if pygame.key.get_pressed()[pygame.K_SPACE]:
+                sustained_voices.append(voice)
+            else:
+                voice.release()
         pygame.time.set_timer(pygame.USEREVENT, 1000)
 
 
-def main_loop():
+def main_loop(fps=FRAME_RATE, seed=None):
     """Main loop for handling events and rendering the scene."""
     display = (600, 600)
     init_pygame(display)
-    particles = []
+    # Open the audio output and start the engine thread now, not on the first key
+    get_engine()
+    # A fixed seed replays the same particles, for comparable benchmark runs
+    particles = ParticleSystem(rng=seed)
+    scene = ParticleScene(particles, pacer=FramePacer(fps),
+                          governor=QualityGovernor(particles, budget_ms=frame_budget_ms(fps)))
     running = True
     keys_being_pressed = {}
     note_generators = {}
+    sustained_voices = []
+    latency = LatencyTracker()
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 handle_keydown(event, keys_being_pressed,
-                               note_generators, particles)
+                               note_generators, particles, latency)
             elif event.type == pygame.KEYUP:
-                handle_keyup(event, keys_being_pressed)
-        render_scene(particles)
+                handle_keyup(event, keys_being_pressed,
+                             note_generators, sustained_voices)
+        scene.frame()
+    shutdown_engine()
+    if latency.notes_traced:
+        print(latency.report())
     pygame.quit()
 
 
 if __name__ == "__main__":
-    main_loop()
+    parser = argparse.ArgumentParser(description="Play notes from the keyboard with particle effects.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed the particle effects so runs are reproducible")
+    parser.add_argument("--fps", type=float, default=FRAME_RATE,
+                        help=f"The target frame rate (default {FRAME_RATE})")
+    args = parser.parse_args()
+    main_loop(args.fps, args.seed)
@@ -0,0 +1,189 @@
+"""
+This module renders many scores to audio files in parallel.
+
+Scores are JSON files of the form:
+
+    {
+        "notes": ["D4", "E4", ["F4", "A4"], 67],
+        "durations": [0.5, 0.5, 1.0, 0.5],
+        "transpose": 0,
+        "volume": 0.5
+    }
+
+Notes are note names, MIDI numbers or lists of them for chords. "durations" may be
+a single number for all notes, and every other key is passed to the renderer as a
+note setting. Large scores can instead be .npy score arrays written by
+music.score.save_score, which are memory-mapped and rendered with the default note
+settings. The input is either a directory, searched recursively for *.json and *.npy
+scores, or a manifest: a JSON list of score paths relative to the manifest.
+
+Jobs run in a process pool sized to the core count. Each worker keeps its own note
+cache for its whole lifetime, so notes repeated across the scores handled by that
+worker are only synthesized once. Outputs mirror the input layout under the
+output directory, which makes the result deterministic regardless of scheduling.
+
+Usage:
+    python -m music.batch scores/ rendered/ --format flac
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from .cache import note_cache
+from .graphics.notes_color import note_to_midi
+from .render import write_score, write_score_array
+from .score import load_score as load_score_array
+
+
+def note_number(note, transpose=0):
+    """Converts a note name or MIDI number to a transposed MIDI number."""
+    if isinstance(note, str):
+        try:
+            note = note_to_midi[note]
+        except KeyError:
+            raise ValueError(f"Unknown note name {note!r}") from None
+    return int(note) + transpose
+
+
+def load_score(path):
+    """
+    Load a JSON score.
+
+    Returns:
+        tuple: The notes (MIDI numbers or lists of them), the durations in seconds
+        and the remaining note settings.
+    """
+    with open(path) as file:
+        score = json.load(file)
+    settings = dict(score)
+    transpose = settings.pop("transpose", 0)
+    notes = [
+        [note_number(n, transpose) for n in note] if isinstance(note, list)
+        else note_number(note, transpose)
+        for note in settings.pop("notes")
+    ]
+    durations = settings.pop("durations", 0.5)
+    if not isinstance(durations, list):
+        durations = [durations] * len(notes)
+    return notes, durations, settings
+
+
+def find_scores(source):
+    """Returns the score paths of a directory or a manifest, and the root of their layout."""
+    source = Path(source)
+    if source.is_dir():
+        return sorted([*source.rglob("*.json"), *source.rglob("*.npy")]), source
+    with open(source) as file:
+        manifest = json.load(file)
+    root = source.parent
+    return [root / path for path in manifest], root
+
+
+def plan_jobs(source, output_dir, extension="wav"):
+    """
+    Returns (score path, output path) pairs, the output tree mirroring the input.
+
+    Raises:
+        ValueError: If two scores would be rendered to the same output file, e.g.
+            foo.json and foo.npy, or manifest entries outside the manifest's
+            directory with the same file name.
+    """
+    scores, root = find_scores(source)
+    output_dir = Path(output_dir)
+    jobs = []
+    outputs = {}
+    for score in scores:
+        try:
+            relative = score.resolve().relative_to(root.resolve())
+        except ValueError:
+            relative = Path(score.name)
+        output = output_dir / relative.with_suffix("." + extension)
+        if output in outputs:
+            raise ValueError(f"{outputs[output]} and {score} would both be rendered to {output}")
+        outputs[output] = score
+        jobs.append((score, output))
+    return jobs
+
+
+def _init_worker(cache_bytes):
+    note_cache.resize(cache_bytes)
+
+
+def render_job(job):
+    """Renders one (score path, output path) job in a worker and returns its report."""
+    score_path, output_path = job
+    start = time.perf_counter()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if Path(score_path).suffix == ".npy":
+        notes = load_score_array(score_path)
+        report = write_score_array(output_path, notes)
+    else:
+        notes, durations, settings = load_score(score_path)
+        report = write_score(output_path, notes, durations, **settings)
+    report.update(
+        score=str(score_path),
+        notes=len(notes),
+        job_seconds=time.perf_counter() - start,
+        worker=os.getpid(),
+        cache=note_cache.stats(),
+    )
+    return report
+
+
+def render_batch(source, output_dir, extension="wav", workers=None,
+                 cache_bytes=note_cache.max_bytes):
+    """
+    Render every score of a directory or manifest with a process pool.
+
+    Parameters:
+        source (str): A directory of *.json and *.npy scores or a manifest file.
+        output_dir (str): The directory that receives the rendered files.
+        extension (str): The output file extension, which selects the format.
+        workers (int): The number of processes. Defaults to the number of cores.
+        cache_bytes (int): The note cache budget of each worker.
+
+    Returns:
+        list: The job reports, in the same order as the jobs.
+
+    Raises:
+        ValueError: If two scores map to the same output file; nothing is rendered.
+    """
+    jobs = plan_jobs(source, output_dir, extension)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_bytes,)) as executor:
+        return list(executor.map(render_job, jobs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render many scores to audio files.")
+    parser.add_argument("source", help="A directory of *.json and *.npy scores or a manifest file")
+    parser.add_argument("output_dir", help="The directory for the rendered files")
+    parser.add_argument("--format", dest="extension", default="wav",
+                        help="The output file extension, e.g. wav or flac")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="The number of worker processes (default: one per core)")
+    parser.add_argument("--report", help="Also write the job reports to this JSON file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    reports = render_batch(args.source, args.output_dir, args.extension, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for report in reports:
+        print(f"{report['score']} -> {report['path']}: {report['audio_seconds']:.2f} s audio "
+              f"in {report['job_seconds']:.3f} s (worker {report['worker']}, "
+              f"cache hit rate {report['cache']['hit_rate']:.0%})")
+    audio_seconds = sum(report["audio_seconds"] for report in reports)
+    print(f"Rendered {len(reports)} scores ({audio_seconds:.1f} s of audio) in {elapsed:.2f} s, "
+          f"{len(reports) / elapsed:.1f} scores/s")
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(reports, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+This module provides a bounded LRU cache for rendered note samples.
+
+Rendering a note is deterministic: the same note, duration, volume, sample rate
+and ADSR settings always produce the same int16 buffer. The `NoteCache` class keeps
+recently used buffers in memory up to a byte budget, so repeated notes cost a
+dictionary lookup instead of a full resynthesis. Cached buffers are marked
+read-only, because the same array is handed out to every caller.
+"""
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MiB, a few hundred seconds of mono audio
+
+
+class NoteCache:
+    """
+    A least-recently-used cache of rendered note buffers with a byte budget.
+
+    Parameters:
+        max_bytes (int): The maximum total size of the cached buffers in bytes.
+            Buffers larger than the budget are returned but never stored.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative")
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Returns the cached buffer for key, or None if it is not cached."""
+        with self._lock:
+            samples = self._entries.get(key)
+            if samples is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return samples
+
+    def put(self, key, samples):
+        """
+        Stores a buffer under key and returns the read-only cached array.
+
+        The least recently used entries are evicted until the buffer fits the budget.
+        """
+        samples.flags.writeable = False
+        if samples.nbytes > self.max_bytes:
+            return samples
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+            while self._entries and self.current_bytes + samples.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+            self._entries[key] = samples
+            self.current_bytes += samples.nbytes
+        return samples
+
+    def get_or_render(self, key, render):
+        """Returns the cached buffer for key, calling render() to create it on a miss."""
+        samples = self.get(key)
+        if samples is None:
+            samples = self.put(key, render())
+        return samples
+
+    def resize(self, max_bytes):
+        """Changes the byte budget, evicting entries that no longer fit."""
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative")
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._entries and self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every cached buffer. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Returns a dictionary with the cache counters and memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared cache used by music.music.generate_single_note
+note_cache = NoteCache()
@@ -0,0 +1,409 @@
+"""
+This module implements a block-based audio engine with a single output stream.
+
+Instead of opening a new output stream (and thread) for every note, all active
+voices are mixed into fixed-size blocks by one long-lived engine thread and written
+to one sink. The engine caps polyphony by stealing the oldest voice and runs the
+mix through a soft limiter, so many overlapping notes never clip the int16 output.
+
+Sinks:
+    PygameSink: Streams blocks to the sound card through a reserved pygame mixer channel.
+    FileSink: Streams blocks into an audio file with soundfile.
+    NullSink: Discards blocks, for headless runs and benchmarks.
+"""
+
+import threading
+import time
+import numpy as np
+import pygame
+import soundfile as sf
+from .wavetable import get_wavetable, midi_to_frequency
+
+BLOCK_SIZE = 512
+MAX_VOICES = 16
+LIMITER_THRESHOLD = 0.8
+
+
+class SampleVoice:
+    """
+    A voice that plays a pre-rendered buffer once.
+
+    Parameters:
+        samples (np.ndarray): The int16 samples to play.
+        gain (float): A linear gain applied while mixing.
+    """
+
+    def __init__(self, samples, gain=1.0):
+        self.samples = samples
+        self.gain = gain / 32768
+        self.position = 0
+        self.trace = None
+
+    @property
+    def finished(self):
+        return self.position >= len(self.samples)
+
+    def render(self, num_frames):
+        """Returns up to num_frames float32 samples and advances the voice."""
+        chunk = self.samples[self.position:self.position + num_frames]
+        self.position += len(chunk)
+        return chunk.astype(np.float32) * self.gain
+
+
+class StreamingVoice:
+    """
+    A voice synthesized block by block while its note is held.
+
+    The oscillator and the ADSR envelope advance one block at a time, so the attack
+    is audible as soon as the first block is mixed and a held note costs constant
+    memory. The envelope stays at the sustain level until release() is called, which
+    starts the release stage from the current level at the next block. release() is
+    called from other threads than the engine's, so it only raises a flag and every
+    stage change happens in the engine thread.
+
+    Parameters:
+        note (int): The MIDI note number.
+        volume (float): The volume of the note (0 to 1).
+        sample_rate (int): The sample rate of the audio.
+        attack_time (float): The attack time of the note in seconds.
+        decay_time (float): The decay time of the note in seconds.
+        sustain_level (float): The sustain level of the note (0 to 1).
+        release_time (float): The release time of the note in seconds.
+        waveform (str): The wavetable waveform name.
+    """
+
+    def __init__(self, note, volume=0.5, sample_rate=44100, attack_time=0.01,
+                 decay_time=0.01, sustain_level=0.7, release_time=0.01, waveform="harmonic"):
+        self.note = note
+        self.volume = volume
+        self.sample_rate = sample_rate
+        self.sustain_level = sustain_level
+        self.wavetable = get_wavetable(waveform)
+        self.frequency = float(midi_to_frequency(note))
+        self.phase = 0.0
+        self.level = 0.0
+        self.stage = "attack"
+        # Per-sample envelope slopes; a zero-length stage jumps straight to its target
+        self.attack_step = 1.0 / max(1, int(attack_time * sample_rate))
+        self.decay_step = (1.0 - sustain_level) / max(1, int(decay_time * sample_rate))
+        self.release_samples = max(1, int(release_time * sample_rate))
+        self.release_step = 0.0
+        self._release_requested = False
+        self.trace = None
+
+    @property
+    def finished(self):
+        return self.stage == "done"
+
+    @property
+    def released(self):
+        return self._release_requested or self.stage in ("release", "done")
+
+    def release(self):
+        """Note-off: the release stage starts from the current level at the next block."""
+        self._release_requested = True
+
+    def render(self, num_frames):
+        """Returns the next num_frames float32 samples, or fewer once the release ends."""
+        envelope = self._envelope(num_frames)
+        samples, self.phase = self.wavetable.render(
+            self.frequency, len(envelope), self.sample_rate, self.phase)
+        samples *= envelope
+        samples *= self.volume
+        return samples.astype(np.float32)
+
+    def _ramp(self, envelope, start, target, step):
+        """Fills envelope from start with a linear ramp towards target. Returns the new start."""
+        needed = int(np.ceil(abs(target - self.level) / step)) if step > 0 else 0
+        count = min(len(envelope) - start, needed)
+        direction = 1.0 if target > self.level else -1.0
+        envelope[start:start + count] = self.level + direction * step * np.arange(1, count + 1)
+        if count == needed:
+            # The stage is complete; land exactly on the target
+            if count:
+                envelope[start + count - 1] = target
+            self.level = target
+        else:
+            self.level = envelope[start + count - 1]
+        return start + count
+
+    def _envelope(self, num_frames):
+        if self._release_requested and self.stage not in ("release", "done"):
+            self.stage = "release"
+            self.release_step = self.level / self.release_samples
+        envelope = np.empty(num_frames)
+        filled = 0
+        while filled < num_frames:
+            if self.stage == "attack":
+                filled = self._ramp(envelope, filled, 1.0, self.attack_step)
+                if self.level == 1.0:
+                    self.stage = "decay"
+            elif self.stage == "decay":
+                filled = self._ramp(envelope, filled, self.sustain_level, self.decay_step)
+                if self.level == self.sustain_level:
+                    self.stage = "sustain"
+            elif self.stage == "sustain":
+                envelope[filled:] = self.level
+                filled = num_frames
+            elif self.stage == "release":
+                filled = self._ramp(envelope, filled, 0.0, self.release_step)
+                if self.level == 0.0:
+                    self.stage = "done"
+            else:
+                return envelope[:filled]
+        return envelope
+
+
+def soft_limit(block, threshold=LIMITER_THRESHOLD):
+    """
+    Compress samples above threshold smoothly towards full scale.
+
+    Samples within [-threshold, threshold] pass unchanged. Louder samples are mapped
+    with tanh so the output never exceeds 1.0 and the knee has no sharp corner.
+    """
+    magnitude = np.abs(block)
+    over = magnitude > threshold
+    if not over.any():
+        return block
+    headroom = 1.0 - threshold
+    limited = threshold + headroom * np.tanh((magnitude[over] - threshold) / headroom)
+    block[over] = np.copysign(limited, block[over])
+    return block
+
+
+class AudioEngine:
+    """
+    Mixes all active voices into fixed-size blocks written to one sink.
+
+    Parameters:
+        sink: An object with a write(block) method taking an int16 block and an
+            optional close() method. Defaults to a PygameSink.
+        sample_rate (int): The sample rate of the audio.
+        block_size (int): The number of frames mixed per block.
+        max_voices (int): The polyphony cap. Adding a voice beyond it steals the oldest.
+        limiter_threshold (float): The level (0 to 1) where the soft limiter starts.
+    """
+
+    def __init__(self, sink=None, sample_rate=44100, block_size=BLOCK_SIZE,
+                 max_voices=MAX_VOICES, limiter_threshold=LIMITER_THRESHOLD):
+        if max_voices < 1:
+            raise ValueError("max_voices must be at least 1")
+        self.sink = sink if sink is not None else PygameSink(sample_rate, block_size)
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.limiter_threshold = limiter_threshold
+        self.voices = []
+        self.taps = []
+        self.stolen_voices = 0
+        self.blocks_rendered = 0
+        self._pending_traces = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def add_voice(self, voice, trace=None):
+        """
+        Starts playing a voice, stealing the oldest one if polyphony is exhausted.
+
+        An optional music.latency.LatencyTrace is stamped when the voice's first
+        samples are synthesized and when they are handed to the sink.
+        """
+        voice.trace = trace
+        with self._lock:
+            while len(self.voices) >= self.max_voices:
+                self.voices.pop(0)
+                self.stolen_voices += 1
+            self.voices.append(voice)
+        return voice
+
+    def play(self, samples, gain=1.0, trace=None):
+        """Plays a pre-rendered int16 buffer and returns its voice."""
+        return self.add_voice(SampleVoice(samples, gain), trace)
+
+    def note_on(self, note, trace=None, **voice_settings):
+        """Starts a StreamingVoice for note and returns it. Call note_off(voice) to release it."""
+        voice_settings.setdefault("sample_rate", self.sample_rate)
+        return self.add_voice(StreamingVoice(note, **voice_settings), trace)
+
+    def note_off(self, voice):
+        """Starts the release stage of a voice returned by note_on."""
+        voice.release()
+
+    def add_tap(self, tap):
+        """Registers a callable that receives every mixed int16 block, e.g. a recorder."""
+        self.taps.append(tap)
+
+    def remove_tap(self, tap):
+        self.taps.remove(tap)
+
+    def stop_all(self):
+        """Silences every active voice."""
+        with self._lock:
+            self.voices.clear()
+
+    @property
+    def active_voices(self):
+        return len(self.voices)
+
+    def render_block(self):
+        """Mixes one block of every active voice and returns it as int16."""
+        with self._lock:
+            voices = list(self.voices)
+        mix = np.zeros(self.block_size, dtype=np.float32)
+        for voice in voices:
+            trace = voice.trace
+            if trace is not None:
+                trace.mark("synth_start")
+            chunk = voice.render(self.block_size)
+            mix[:len(chunk)] += chunk
+            if trace is not None:
+                trace.mark("synth_end")
+                self._pending_traces.append(trace)
+                voice.trace = None
+        with self._lock:
+            self.voices = [voice for voice in self.voices if not voice.finished]
+        soft_limit(mix, self.limiter_threshold)
+        self.blocks_rendered += 1
+        block = (mix * 32767).astype(np.int16)
+        for tap in self.taps:
+            tap(block)
+        return block
+
+    def start(self):
+        """Starts the engine thread that feeds the sink."""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="AudioEngine", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the engine thread and closes the sink."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if hasattr(self.sink, "close"):
+            self.sink.close()
+
+    def _run(self):
+        while self._running:
+            # The sink blocks until it can take more audio, which paces the loop
+            self.sink.write(self.render_block())
+            self.submit_traces()
+
+    def submit_traces(self):
+        """Stamps the traces of the last rendered block as submitted and finishes them."""
+        traces, self._pending_traces = self._pending_traces, []
+        for trace in traces:
+            trace.mark("submit")
+            trace.finish()
+
+
+class PygameSink:
+    """
+    Streams blocks to the sound card through one reserved pygame mixer channel.
+
+    Each block is queued behind the one currently playing, so at most two blocks
+    are buffered ahead of the speaker. The blocks are int16 at sample_rate, so a
+    mixer already running at another rate or sample format (pygame.init() lets SDL
+    pick the device's rate) is reopened with exactly these settings.
+
+    Raises:
+        RuntimeError: If the mixer cannot be opened at sample_rate.
+    """
+
+    POLL_INTERVAL = 0.001
+
+    def __init__(self, sample_rate=44100, block_size=BLOCK_SIZE):
+        settings = pygame.mixer.get_init()
+        if settings and settings[:2] != (sample_rate, -16):
+            pygame.mixer.quit()
+            settings = None
+        if not settings:
+            # allowedchanges=0: SDL resamples instead of changing the rate or format
+            pygame.mixer.init(sample_rate, -16, 1, block_size, allowedchanges=0)
+            settings = pygame.mixer.get_init()
+        if not settings or settings[:2] != (sample_rate, -16):
+            raise RuntimeError(f"Could not open the mixer at {sample_rate} Hz, 16-bit; "
+                               f"got {settings}")
+        self.output_channels = settings[2]
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+    def write(self, block):
+        if self.output_channels > 1:
+            block = np.repeat(block[:, None], self.output_channels, axis=1)
+        sound = pygame.mixer.Sound(buffer=block.tobytes())
+        while self.channel.get_queue() is not None:
+            time.sleep(self.POLL_INTERVAL)
+        if self.channel.get_busy():
+            self.channel.queue(sound)
+        else:
+            self.channel.play(sound)
+
+    def close(self):
+        self.channel.stop()
+
+
+class FileSink:
+    """
+    Streams blocks into an audio file. The format is taken from the file extension
+    unless file_format is given.
+    """
+
+    def __init__(self, path, sample_rate=44100, file_format=None):
+        self.file = sf.SoundFile(path, "w", samplerate=sample_rate, channels=1,
+                                 format=file_format)
+        self.frames_written = 0
+
+    def write(self, block):
+        self.file.write(block)
+        self.frames_written += len(block)
+
+    def close(self):
+        self.file.close()
+
+
+class NullSink:
+    """
+    Discards blocks, counting the frames written.
+
+    Parameters:
+        sample_rate (int): Used to pace writes when realtime is True.
+        realtime (bool): Sleep for the duration of each block, like a sound card would.
+    """
+
+    def __init__(self, sample_rate=44100, realtime=False):
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.frames_written = 0
+
+    def write(self, block):
+        self.frames_written += len(block)
+        if self.realtime:
+            time.sleep(len(block) / self.sample_rate)
+
+    def close(self):
+        pass
+
+
+_engine = None
+
+
+def get_engine():
+    """Returns the shared engine playing to the sound card, starting it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = AudioEngine().start()
+    return _engine
+
+
+def shutdown_engine():
+    """Stops the shared engine if it was started."""
+    global _engine
+    if _engine is not None:
+        _engine.stop()
+        _engine = None
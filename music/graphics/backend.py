@@ -0,0 +1,187 @@
+"""
+This module abstracts the OpenGL calls made by the visual path.
+
+render_scene, the particle renderers and david2.draw_pyramid draw through a backend
+object instead of calling OpenGL directly:
+
+    GLBackend: Forwards every call to PyOpenGL and pygame. This is the default.
+    NullBackend: Draws nothing. It counts draw calls, vertices and state changes and
+        measures the CPU cost of each frame, so the particle update and draw loop can
+        be profiled and compared across renderers on a machine without a display.
+"""
+
+import time
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+
+
+def sphere_vertex_count(slices, stacks):
+    """The number of vertices glutSolidSphere submits for a sphere."""
+    return slices * stacks * 6
+
+
+class GLBackend:
+    """Draws with PyOpenGL."""
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        pygame.display.flip()
+
+    def clear(self):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    def rotate(self, angle, x, y, z):
+        glRotatef(angle, x, y, z)
+
+    def color(self, rgba):
+        if len(rgba) == 4:
+            glColor4fv(rgba)
+        else:
+            glColor3fv(rgba)
+
+    def set_blending(self, enabled):
+        if enabled:
+            glEnable(GL_BLEND)
+        else:
+            glDisable(GL_BLEND)
+
+    def push_matrix(self):
+        glPushMatrix()
+
+    def pop_matrix(self):
+        glPopMatrix()
+
+    def translate(self, x, y, z):
+        glTranslatef(x, y, z)
+
+    def solid_sphere(self, radius, slices, stacks):
+        glutSolidSphere(radius, slices, stacks)
+
+    def triangles(self, vertices):
+        """Draws a (N, 3) array of triangle vertices in immediate mode."""
+        glBegin(GL_TRIANGLES)
+        for vertex in vertices:
+            glVertex3fv(vertex)
+        glEnd()
+
+    def triangle_arrays(self, vertices, colors, indices):
+        """Draws indexed triangles from client-side vertex and color arrays in one call."""
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glColorPointer(4, GL_FLOAT, 0, colors)
+        glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, indices)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+
+class NullBackend:
+    """
+    Records what would have been drawn instead of drawing it.
+
+    Counters (reset with reset()):
+        frames: The number of end_frame calls.
+        draw_calls: Calls that submit geometry.
+        vertices: Vertices submitted, counting each index of indexed draws.
+        state_changes: Color, matrix and client-state changes.
+        calls: Every backend call, i.e. Python to OpenGL transitions in GLBackend.
+        frame_times: The CPU time of each frame, from begin_frame to end_frame, in seconds.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.draw_calls = 0
+        self.vertices = 0
+        self.state_changes = 0
+        self.calls = 0
+        self.frame_times = []
+        self._frame_start = None
+
+    def begin_frame(self):
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._frame_start is not None:
+            self.frame_times.append(time.perf_counter() - self._frame_start)
+            self._frame_start = None
+        self.frames += 1
+        self.calls += 1
+
+    def _state(self, calls=1):
+        self.state_changes += calls
+        self.calls += calls
+
+    def _draw(self, vertices, calls=1):
+        self.draw_calls += 1
+        self.vertices += vertices
+        self.calls += calls
+
+    def clear(self):
+        self.calls += 1
+
+    def rotate(self, angle, x, y, z):
+        self._state()
+
+    def color(self, rgba):
+        self._state()
+
+    def set_blending(self, enabled):
+        self._state()
+
+    def push_matrix(self):
+        self._state()
+
+    def pop_matrix(self):
+        self._state()
+
+    def translate(self, x, y, z):
+        self._state()
+
+    def solid_sphere(self, radius, slices, stacks):
+        self._draw(sphere_vertex_count(slices, stacks))
+
+    def triangles(self, vertices):
+        # glBegin, one glVertex3fv per vertex and glEnd
+        self._draw(len(vertices), calls=len(vertices) + 2)
+
+    def triangle_arrays(self, vertices, colors, indices):
+        # Enabling and disabling the two client states and setting the two pointers
+        self._state(calls=6)
+        self._draw(len(indices))
+
+    def stats(self):
+        """Returns the counters, with per-frame averages and frame time percentiles."""
+        frames = max(self.frames, 1)
+        times = np.array(self.frame_times) * 1000
+        stats = {
+            "frames": self.frames,
+            "draw_calls_per_frame": self.draw_calls / frames,
+            "vertices_per_frame": self.vertices / frames,
+            "state_changes_per_frame": self.state_changes / frames,
+            "calls_per_frame": self.calls / frames,
+        }
+        if len(times):
+            stats.update(
+                frame_ms_mean=float(times.mean()),
+                frame_ms_p50=float(np.percentile(times, 50)),
+                frame_ms_p95=float(np.percentile(times, 95)),
+            )
+        return stats
+
+
+_default_backend = None
+
+
+def default_backend():
+    """Returns the shared GLBackend."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = GLBackend()
+    return _default_backend
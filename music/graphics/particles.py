@@ -2,33 +2,113 @@
 This script defines a Particle class that represents a group of particles moving in a 3D space.
 The particles are rendered as spheres using PyOpenGL and Pygame. The Particle class has methods
 to update the position of the particles, draw them, and create visual effects like smoke trails.
+The ParticleSystem class keeps the particles of every emitter in shared arrays, so they can
+all be moved together with vectorized NumPy operations.
+ParticleScene advances the particles on a fixed simulation timestep and draws them at
+a paced frame rate, so the animation speed does not depend on the frame rate.
 The script also demonstrates how to create a simple scene with multiple particles
 moving in different directions.
 """
 
-import random
+import time
 import numpy as np
 import pygame
 from .notes_color import note_to_color
+from .renderer import SphereBatchRenderer
+from .backend import default_backend
+from .timing import SimulationClock, FramePacer
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 from pygame.locals import *
 
 
-def update_particles(particles):
-    """Updates and renders particles."""
+# Degrees the scene turns per simulation step
+ROTATION_PER_STEP = 1
+
+
+def step_particles(particles):
+    """Advances particles, either a ParticleSystem or a list of Particle, by one simulation step."""
+    if isinstance(particles, ParticleSystem):
+        particles.move()
+        return
     for particle in particles:
         particle.move()
-        particle.draw()
 
-def render_scene(particles):
-    """Renders the OpenGL scene."""
-    glRotatef(1, 3, 1, 1)
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    update_particles(particles)
-    pygame.display.flip()
-    pygame.time.wait(10)
+def draw_particles(particles, backend=None, interpolation=1.0):
+    """Draws particles, either a ParticleSystem or a list of Particle."""
+    if isinstance(particles, ParticleSystem):
+        particles.draw(backend, interpolation)
+        return
+    for particle in particles:
+        particle.draw(backend)
+
+def update_particles(particles, backend=None):
+    """Updates and renders particles, either a ParticleSystem or a list of Particle."""
+    step_particles(particles)
+    draw_particles(particles, backend)
+
+def render_scene(particles, backend=None, steps=1, interpolation=1.0, present=True):
+    """
+    Render the OpenGL scene.
+
+    Parameters:
+        particles: A ParticleSystem or a list of Particle, already advanced by the caller.
+        backend: The rendering backend. Defaults to the shared GLBackend.
+        steps (int): The simulation steps since the last rendered frame; the scene
+            turns by ROTATION_PER_STEP for each.
+        interpolation (float): Passed to ParticleSystem.draw.
+        present (bool): End the frame, flipping the buffers. When False the caller
+            calls backend.end_frame().
+    """
+    backend = backend or default_backend()
+    backend.begin_frame()
+    if steps:
+        backend.rotate(ROTATION_PER_STEP * steps, 3, 1, 1)
+    backend.clear()
+    draw_particles(particles, backend, interpolation)
+    if present:
+        backend.end_frame()
+
+
+class ParticleScene:
+    """
+    Runs the particle simulation on a fixed timestep and draws it at a paced frame rate.
+
+    Parameters:
+        particles: A ParticleSystem or a list of Particle.
+        clock (SimulationClock): The simulation clock. Defaults to SIMULATION_HZ steps.
+        pacer (FramePacer): The frame pacer. Defaults to TARGET_FPS.
+        backend: The rendering backend. Defaults to the shared GLBackend.
+        governor (QualityGovernor): Receives the work time of every frame, to adapt
+            the particle quality to the frame budget.
+    """
+
+    def __init__(self, particles, clock=None, pacer=None, backend=None, governor=None):
+        self.particles = particles
+        self.clock = clock or SimulationClock()
+        self.pacer = pacer or FramePacer()
+        self.backend = backend
+        self.governor = governor
+        self.unrendered_steps = 0
+
+    def frame(self):
+        """Runs the simulation steps that are due, then draws a frame unless it is skipped."""
+        start = time.perf_counter()
+        steps = self.clock.tick()
+        for _ in range(steps):
+            step_particles(self.particles)
+        self.unrendered_steps += steps
+        if self.pacer.should_render():
+            render_scene(self.particles, self.backend, self.unrendered_steps,
+                         self.clock.interpolation, present=False)
+            # The flip waits for vsync, so it is not counted as work
+            work_time = time.perf_counter() - start
+            (self.backend or default_backend()).end_frame()
+            self.unrendered_steps = 0
+            if self.governor is not None:
+                self.governor.record(work_time)
+        self.pacer.wait()
 
 class Particle:
     VELOCITY_STD_DEV = 0.001
@@ -66,42 +146,64 @@ class Particle:
             [[0.5, -np.sqrt(3) / 2, 0], [-1, 0, 0]],
         ]
     )
-    # Initialize the last assigned side index
+    # Both pyramids' sides, indexed by [side index % 2, side index % 9]
+    PYRAMID_SIDES = np.stack([UPWARD_PYRAMID_SIDES, DOWNWARD_PYRAMID_SIDES])
+    # Side index shared by the Particle emitters created without their own
     last_side_index = 0
 
-    def __init__(self, x, y, z, note):
-        num_particles = random.randint(20, 30)
-        self.particles = []
-        for i in range(num_particles):
-            position = np.array([x, y, z], dtype=np.float64) + np.random.normal(
-                0, self.POSITION_STD_DEV, 3
-            )
-            velocity = np.random.normal(0, self.VELOCITY_STD_DEV, 3)
-            # Add upward bias to the y component of velocity
-            velocity[1] += self.UPWARD_BIAS
-            # Assign each particle to a side of the pyramids
-            if Particle.last_side_index % 2 == 0:
-                side = self.UPWARD_PYRAMID_SIDES[
-                    Particle.last_side_index % len(self.UPWARD_PYRAMID_SIDES)
-                ]
-            else:
-                side = self.DOWNWARD_PYRAMID_SIDES[
-                    Particle.last_side_index % len(self.DOWNWARD_PYRAMID_SIDES)
-                ]
-            # Choose a random point on the side
-            t = np.random.uniform(0, 1)
-            target = side[0] * (1 - t) + side[1] * t
-            self.particles.append(
-                {
-                    "position": position,
-                    "velocity": velocity,
-                    "alpha": 0.5,
-                    "size": 0.07,
-                    "target": target,
-                }
-            )
-            # Increment the last assigned side index
-            Particle.last_side_index += 1
+    @classmethod
+    def spawn(cls, x, y, z, count, rng, first_side=0):
+        """
+        Generate a burst of particles around (x, y, z) with vectorized NumPy operations.
+
+        Successive particles alternate between the upward and downward pyramids and
+        cycle through their sides, starting from first_side.
+
+        Parameters:
+            rng (numpy.random.Generator): The random generator.
+            first_side (int): The side index of the first particle.
+
+        Returns:
+            tuple: The (count, 3) positions, velocities and targets.
+        """
+        noise = rng.standard_normal((count, 2, 3))
+        positions = noise[:, 0] * cls.POSITION_STD_DEV + np.array([x, y, z], dtype=np.float64)
+        velocities = noise[:, 1] * cls.VELOCITY_STD_DEV
+        # Add upward bias to the y component of velocity
+        velocities[:, 1] += cls.UPWARD_BIAS
+        # Assign each particle to a side of the pyramids
+        side_indices = first_side + np.arange(count)
+        sides = cls.PYRAMID_SIDES[side_indices % 2,
+                                  side_indices % cls.PYRAMID_SIDES.shape[1]]
+        # Choose a random point on each side
+        t = rng.random((count, 1))
+        targets = sides[:, 0] + (sides[:, 1] - sides[:, 0]) * t
+        return positions, velocities, targets
+
+    def __init__(self, x, y, z, note, rng=None, side_index=None):
+        """
+        Parameters:
+            rng: A numpy Generator or a seed for one. Defaults to fresh OS entropy.
+            side_index (int): The pyramid side of the first particle. Defaults to
+                continuing from Particle.last_side_index.
+        """
+        self.rng = np.random.default_rng(rng)
+        num_particles = int(self.rng.integers(20, 31))
+        if side_index is None:
+            side_index = Particle.last_side_index
+            Particle.last_side_index += num_particles
+        positions, velocities, targets = self.spawn(
+            x, y, z, num_particles, self.rng, side_index)
+        self.particles = [
+            {
+                "position": position,
+                "velocity": velocity,
+                "alpha": 0.5,
+                "size": 0.07,
+                "target": target,
+            }
+            for position, velocity, target in zip(positions, velocities, targets)
+        ]
         if isinstance(note, list):
             self.note = note[0]
         else:
@@ -143,16 +245,214 @@ class Particle:
                 particle["velocity"] = np.zeros(3)
 
             if not np.all(np.abs(particle["position"]) <= 50):
-                particle["position"] = np.random.normal(0, self.POSITION_STD_DEV, 3)
+                particle["position"] = self.rng.normal(0, self.POSITION_STD_DEV, 3)
 
-    def draw(self):
+    def draw(self, backend=None):
+        backend = backend or default_backend()
         for particle in self.particles:
-            glColor4fv((*note_to_color.get(self.note, (1, 1, 1)), particle["alpha"]))
-            glPushMatrix()
-            glTranslatef(*particle["position"])
+            backend.color((*note_to_color.get(self.note, (1, 1, 1)), particle["alpha"]))
+            backend.push_matrix()
+            backend.translate(*particle["position"])
             # Use self.size instead of a magic number
-            glutSolidSphere(particle["size"], 20, 20)
-            glPopMatrix()
+            backend.solid_sphere(particle["size"], 20, 20)
+            backend.pop_matrix()
+
+
+DEFAULT_CAPACITY = 4096
+# Range of the number of particles of one burst
+BURST_SIZE = (20, 30)
+
+# RGB color of every MIDI note; the extra last row (index -1) is the default white
+NOTE_COLORS = np.ones((129, 3), dtype=np.float32)
+for _note, _color in note_to_color.items():
+    NOTE_COLORS[_note] = _color
+
+
+class ParticleSystem:
+    """
+    A fixed-capacity pool of the particles of all emitters, stored as a struct of arrays.
+
+    Positions, velocities and targets are contiguous (capacity, 3) float32 arrays, with
+    the alpha, size and MIDI note of each particle in arrays beside them, so moving
+    every particle is a handful of vectorized operations instead of a Python loop per
+    particle. Particles that fade out or shrink away are culled after each move and
+    their slots are pushed on a free-slot stack, from which new bursts take their slots
+    in O(1). Emitting follows the same rules as the Particle class.
+
+    Parameters:
+        capacity (int): The maximum number of live particles.
+        full_policy (str): What emit does when the pool is full: "drop_oldest" recycles
+            the oldest live particles, "refuse" only spawns as many as there are free
+            slots.
+        renderer: The object that draws the particles. Defaults to a
+            SphereBatchRenderer, which draws them all in one call, on the default backend.
+        rng: A numpy Generator or a seed for one. Every random draw of the system
+            comes from it, and the pyramid side counter is per system, so two systems
+            with the same seed fed the same emits produce the same particles.
+
+    The number of live particles can be lowered below the capacity with set_max_live,
+    and burst_size sets the range of particles spawned per emit.
+    """
+
+    POLICIES = ("drop_oldest", "refuse")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, full_policy="drop_oldest", renderer=None,
+                 rng=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if full_policy not in self.POLICIES:
+            raise ValueError(f"full_policy must be one of {self.POLICIES}")
+        self.capacity = capacity
+        self.full_policy = full_policy
+        self.max_live = capacity
+        self.burst_size = BURST_SIZE
+        self.rng = np.random.default_rng(rng)
+        self.side_index = 0
+        self.renderer = renderer if renderer is not None else SphereBatchRenderer()
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        # Positions before the last move, to interpolate between simulation steps
+        self.previous_positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 3), dtype=np.float32)
+        self.targets = np.zeros((capacity, 3), dtype=np.float32)
+        self.alphas = np.zeros(capacity, dtype=np.float32)
+        self.sizes = np.zeros(capacity, dtype=np.float32)
+        self.notes = np.full(capacity, -1, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+        # Spawn serial of each slot, used to find the oldest particles
+        self.born = np.zeros(capacity, dtype=np.int64)
+        # Stack of free slots; the top is free_slots[free_count - 1]
+        self.free_slots = np.arange(capacity - 1, -1, -1, dtype=np.int64)
+        self.free_count = capacity
+        self.spawned = 0
+        self.culled = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def __len__(self):
+        return self.live_count
+
+    @property
+    def live_count(self):
+        return self.capacity - self.free_count
+
+    def live_indices(self):
+        """Returns the slot indices of the live particles."""
+        return np.flatnonzero(self.alive)
+
+    def set_max_live(self, max_live):
+        """Limits the number of live particles, recycling the oldest ones above the limit."""
+        self.max_live = max(1, min(int(max_live), self.capacity))
+        excess = self.live_count - self.max_live
+        if excess > 0:
+            self._release(self._oldest(excess))
+            self.dropped += excess
+
+    def _claim(self, count):
+        """Takes up to count slots from the free stack, applying the full policy."""
+        available = min(self.free_count, self.max_live - self.live_count)
+        shortfall = count - available
+        if shortfall > 0:
+            if self.full_policy == "refuse":
+                self.refused += shortfall
+                count = available
+            else:
+                self._release(self._oldest(min(shortfall, self.live_count)))
+                self.dropped += min(shortfall, self.live_count)
+                count = min(count, self.free_count, self.max_live - self.live_count)
+        self.free_count -= count
+        return self.free_slots[self.free_count:self.free_count + count].copy()
+
+    def _oldest(self, count):
+        live = self.live_indices()
+        if count >= len(live):
+            return live
+        return live[np.argpartition(self.born[live], count)[:count]]
+
+    def _release(self, slots):
+        """Pushes slots back on the free stack."""
+        self.alive[slots] = False
+        self.free_slots[self.free_count:self.free_count + len(slots)] = slots
+        self.free_count += len(slots)
+
+    def emit(self, x, y, z, note):
+        """Adds a burst of particles (20-30 by default) around (x, y, z) flying to the pyramid sides."""
+        num_particles = int(self.rng.integers(self.burst_size[0], self.burst_size[1] + 1))
+        slots = self._claim(num_particles)
+        positions, velocities, targets = Particle.spawn(
+            x, y, z, len(slots), self.rng, self.side_index)
+        self.side_index += len(slots)
+        self.positions[slots] = positions
+        self.velocities[slots] = velocities
+        self.targets[slots] = targets
+
+        if isinstance(note, list):
+            note = note[0]
+        note = note if isinstance(note, (int, np.integer)) and 0 <= note < 128 else -1
+        self.previous_positions[slots] = self.positions[slots]
+        self.alphas[slots] = 0.5
+        self.sizes[slots] = 0.07
+        self.notes[slots] = note
+        self.alive[slots] = True
+        self.born[slots] = self.spawned + np.arange(len(slots))
+        self.spawned += len(slots)
+
+    def move(self):
+        """
+        Moves every live particle a fixed step towards its target, fading and shrinking
+        it, then recycles the particles that have faded out or shrunk away. One call
+        is one simulation step.
+        """
+        live = self.live_indices()
+        positions = self.positions[live]
+        self.previous_positions[live] = positions
+        offsets = self.targets[live] - positions
+        distances = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+        moving = distances > Particle.VELOCITY_CHANGE_STD_DEV
+        steps = Particle.VELOCITY_CHANGE_STD_DEV / distances[moving]
+        positions[moving] += offsets[moving] * steps[:, None]
+        self.positions[live] = positions
+        self.alphas[live] -= Particle.ALPHA_DECAY_RATE
+        # Decrease size to create a smoke-like effect
+        self.sizes[live] -= Particle.SHRINK_RATE
+
+        dead = live[(self.alphas[live] <= 0) | (self.sizes[live] <= 0)]
+        if len(dead):
+            self._release(dead)
+            self.culled += len(dead)
+
+    def colors(self, indices=None):
+        """Returns the (N, 4) RGBA colors of the live particles, or of the given slots."""
+        if indices is None:
+            indices = self.live_indices()
+        return np.column_stack([NOTE_COLORS[self.notes[indices]], self.alphas[indices]])
+
+    def stats(self):
+        """Returns the pool counters."""
+        return {
+            "live": self.live_count,
+            "capacity": self.capacity,
+            "max_live": self.max_live,
+            "spawned": self.spawned,
+            "culled": self.culled,
+            "dropped": self.dropped,
+            "refused": self.refused,
+        }
+
+    def draw(self, backend=None, interpolation=1.0):
+        """
+        Draw the live particles with the system's renderer.
+
+        Parameters:
+            backend: Draws on this backend instead of the renderer's own.
+            interpolation (float): Where to draw the particles between their previous
+                and current simulation positions, from 0 to 1.
+        """
+        live = self.live_indices()
+        positions = self.positions[live]
+        if interpolation < 1.0:
+            previous = self.previous_positions[live]
+            positions = previous + (positions - previous) * np.float32(interpolation)
+        self.renderer.draw(positions, self.sizes[live], self.colors(live), backend)
 
 
 if __name__ == "__main__":
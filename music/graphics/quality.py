@@ -0,0 +1,128 @@
+"""
+This module keeps the visualizer within its frame-time budget by adjusting the detail
+of the particle effects.
+
+QualityGovernor collects the work time of every frame (simulation and drawing, not
+the buffer flip, which waits for vsync, nor the pacing sleep) and, once per window
+of frames, compares the 90th percentile with the budget. Above the budget it steps
+down one quality level; well below it for a few windows in a row it steps back up.
+Each level sets:
+
+    tessellation: The (slices, stacks) of the shared sphere mesh.
+    max_live: The most live particles.
+    burst_size: The range of particles spawned per note.
+    blending: Whether alpha blending is enabled.
+
+Every change is reported through the log function, print by default. The budget
+should not be shorter than the display refresh interval; frame_budget_ms picks it.
+"""
+
+import numpy as np
+import pygame
+from .backend import default_backend
+
+QUALITY_LEVELS = (
+    {"tessellation": (12, 8), "max_live": 4096, "burst_size": (20, 30), "blending": True},
+    {"tessellation": (10, 6), "max_live": 2048, "burst_size": (15, 22), "blending": True},
+    {"tessellation": (8, 6), "max_live": 1024, "burst_size": (10, 15), "blending": True},
+    {"tessellation": (6, 4), "max_live": 512, "burst_size": (6, 10), "blending": False},
+    {"tessellation": (4, 3), "max_live": 256, "burst_size": (3, 6), "blending": False},
+)
+
+WINDOW_FRAMES = 30
+# Assumed when the display refresh rate cannot be queried
+DEFAULT_REFRESH_HZ = 60
+# Upgrade only when the frames use less than this fraction of the budget
+UPGRADE_HEADROOM = 0.6
+UPGRADE_WINDOWS = 3
+
+
+def frame_budget_ms(fps, refresh_hz=None):
+    """
+    Returns the frame-time budget for a target frame rate.
+
+    The budget is never shorter than one display refresh, since a vsynced display
+    cannot show frames faster than that however little work they take.
+
+    Parameters:
+        fps (float): The target frame rate. 0, which FramePacer takes as unpaced,
+            gives the refresh interval.
+        refresh_hz (float): The display refresh rate. Defaults to the rate of the
+            current display, or DEFAULT_REFRESH_HZ when it is unknown.
+    """
+    if refresh_hz is None:
+        get_refresh_rate = getattr(pygame.display, "get_current_refresh_rate", None)
+        refresh_hz = get_refresh_rate() if get_refresh_rate is not None else 0
+        refresh_hz = refresh_hz or DEFAULT_REFRESH_HZ
+    refresh_ms = 1000 / refresh_hz
+    if fps <= 0:
+        return refresh_ms
+    return max(1000 / fps, refresh_ms)
+
+
+class QualityGovernor:
+    """
+    Adjusts the particle quality level to hold a frame-time budget.
+
+    Parameters:
+        particles (ParticleSystem): The particle system to adjust.
+        budget_ms (float): The frame-time budget in milliseconds, e.g. 1000 / fps.
+        levels (sequence): The quality levels, from highest to lowest.
+        window (int): The number of frames measured per decision.
+        backend: The backend whose blending is switched. Defaults to the shared GLBackend.
+        log (callable): Receives a message for every change.
+    """
+
+    def __init__(self, particles, budget_ms=1000 / 60, levels=QUALITY_LEVELS,
+                 window=WINDOW_FRAMES, backend=None, log=print):
+        self.particles = particles
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.window = window
+        self.backend = backend
+        self.log = log
+        self.frame_ms = []
+        self.calm_windows = 0
+        self.changes = []
+        self.level = None
+        self.set_level(0, "initial")
+
+    def set_level(self, level, reason=""):
+        """Applies a quality level to the particle system, its renderer and the backend."""
+        level = max(0, min(level, len(self.levels) - 1))
+        if level == self.level:
+            return
+        previous, self.level = self.level, level
+        settings = self.levels[level]
+        renderer = self.particles.renderer
+        if (renderer.slices, renderer.stacks) != settings["tessellation"]:
+            renderer.set_tessellation(*settings["tessellation"])
+        self.particles.set_max_live(settings["max_live"])
+        self.particles.burst_size = settings["burst_size"]
+        (self.backend or default_backend()).set_blending(settings["blending"])
+        self.changes.append((previous, level, reason))
+        if previous is not None:
+            self.log(f"Quality level {previous} -> {level} ({reason}): "
+                     f"tessellation {settings['tessellation']}, max {settings['max_live']} "
+                     f"particles, bursts of {settings['burst_size'][0]}-{settings['burst_size'][1]}, "
+                     f"blending {'on' if settings['blending'] else 'off'}")
+
+    def record(self, seconds):
+        """Records the work time of one frame and adjusts the quality at the end of a window."""
+        self.frame_ms.append(seconds * 1000)
+        if len(self.frame_ms) < self.window:
+            return
+        p90 = float(np.percentile(self.frame_ms, 90))
+        self.frame_ms.clear()
+        if p90 > self.budget_ms:
+            self.calm_windows = 0
+            self.set_level(self.level + 1,
+                           f"p90 frame {p90:.1f} ms over the {self.budget_ms:.1f} ms budget")
+        elif p90 < self.budget_ms * UPGRADE_HEADROOM:
+            self.calm_windows += 1
+            if self.calm_windows >= UPGRADE_WINDOWS:
+                self.calm_windows = 0
+                self.set_level(self.level - 1,
+                               f"p90 frame {p90:.1f} ms within the {self.budget_ms:.1f} ms budget")
+        else:
+            self.calm_windows = 0
@@ -0,0 +1,111 @@
+"""
+This module draws particles as spheres through a rendering backend.
+
+SphereBatchRenderer builds one shared unit-sphere mesh, instances it for every live
+particle with NumPy (offset by the particle position and scaled by its size), and
+submits all particles in a single indexed draw call from client-side vertex and
+color arrays. The number of Python to OpenGL calls per frame is therefore constant,
+whatever the particle count.
+
+ImmediateSphereRenderer is the original strategy, one glutSolidSphere per particle,
+kept for comparison.
+"""
+
+import numpy as np
+from .backend import default_backend
+
+SPHERE_SLICES = 12
+SPHERE_STACKS = 8
+
+
+def sphere_mesh(slices=SPHERE_SLICES, stacks=SPHERE_STACKS):
+    """
+    Build a unit sphere as a latitude/longitude grid.
+
+    Returns:
+        tuple: The (V, 3) float32 vertices and the (T * 3,) uint32 triangle indices.
+    """
+    theta = np.linspace(0, np.pi, stacks + 1)[:, None]
+    phi = np.linspace(0, 2 * np.pi, slices + 1)[None, :]
+    vertices = np.stack([
+        np.sin(theta) * np.cos(phi),
+        np.sin(theta) * np.sin(phi),
+        np.cos(theta) * np.ones_like(phi),
+    ], axis=-1).reshape(-1, 3).astype(np.float32)
+
+    row = np.arange(stacks)[:, None] * (slices + 1)
+    column = np.arange(slices)[None, :]
+    a = (row + column).ravel()
+    b = a + slices + 1
+    indices = np.stack([a, b, a + 1, a + 1, b, b + 1], axis=-1).ravel()
+    return vertices, indices.astype(np.uint32)
+
+
+class SphereBatchRenderer:
+    """
+    Draws all particles in one call by instancing a shared sphere mesh on the CPU.
+
+    Parameters:
+        slices (int): The number of subdivisions around the sphere.
+        stacks (int): The number of subdivisions from pole to pole.
+        backend: The rendering backend. Defaults to the shared GLBackend.
+    """
+
+    def __init__(self, slices=SPHERE_SLICES, stacks=SPHERE_STACKS, backend=None):
+        self.backend = backend
+        self.set_tessellation(slices, stacks)
+
+    def set_tessellation(self, slices, stacks):
+        """Rebuilds the shared mesh with a different level of detail."""
+        self.slices = slices
+        self.stacks = stacks
+        self.mesh_vertices, self.mesh_indices = sphere_mesh(slices, stacks)
+        self._indices = np.empty(0, dtype=np.uint32)
+
+    def _instance_indices(self, count):
+        """Returns the triangle indices of count mesh instances, cached for the largest count."""
+        needed = count * len(self.mesh_indices)
+        if len(self._indices) < needed:
+            offsets = np.arange(count, dtype=np.uint32)[:, None] * len(self.mesh_vertices)
+            self._indices = (self.mesh_indices[None, :] + offsets).ravel()
+        return self._indices[:needed]
+
+    def build(self, positions, sizes, colors):
+        """
+        Instance the mesh for every particle.
+
+        Returns:
+            tuple: The (N * V, 3) vertices, the (N * V, 4) colors and the indices.
+        """
+        vertices = (positions[:, None, :]
+                    + sizes[:, None, None] * self.mesh_vertices[None, :, :])
+        vertex_colors = np.repeat(colors.astype(np.float32), len(self.mesh_vertices), axis=0)
+        return (vertices.reshape(-1, 3).astype(np.float32, copy=False), vertex_colors,
+                self._instance_indices(len(positions)))
+
+    def draw(self, positions, sizes, colors, backend=None):
+        if len(positions) == 0:
+            return
+        backend = backend or self.backend or default_backend()
+        backend.triangle_arrays(*self.build(positions, sizes, colors))
+
+
+class ImmediateSphereRenderer:
+    """Draws one glutSolidSphere per particle, as the Particle class does."""
+
+    def __init__(self, slices=20, stacks=20, backend=None):
+        self.backend = backend
+        self.set_tessellation(slices, stacks)
+
+    def set_tessellation(self, slices, stacks):
+        self.slices = slices
+        self.stacks = stacks
+
+    def draw(self, positions, sizes, colors, backend=None):
+        backend = backend or self.backend or default_backend()
+        for color, position, size in zip(colors, positions, sizes):
+            backend.color(color)
+            backend.push_matrix()
+            backend.translate(*position)
+            backend.solid_sphere(size, self.slices, self.stacks)
+            backend.pop_matrix()
@@ -0,0 +1,152 @@
+"""
+This module decouples the simulation speed of the visualizers from their frame rate.
+
+SimulationClock turns wall-clock time into a whole number of fixed simulation steps
+with an accumulator, so particles move at the same speed whatever the frame rate.
+The time left over in the accumulator, as a fraction of a step, is used to
+interpolate between the last two simulation states when drawing.
+
+FramePacer targets a frame rate. It sleeps away the spare time of fast frames and,
+when frames fall behind schedule, skips drawing some of them so the simulation can
+catch up instead of the whole scene slowing down.
+
+Typical loop:
+
+    clock = SimulationClock()
+    pacer = FramePacer(60)
+    while running:
+        for _ in range(clock.tick()):
+            simulate(clock.step)
+        if pacer.should_render():
+            draw(clock.interpolation)
+        pacer.wait()
+"""
+
+import time
+
+SIMULATION_HZ = 100
+MAX_STEPS_PER_TICK = 10
+TARGET_FPS = 60
+MAX_SKIPPED_FRAMES = 4
+
+
+class SimulationClock:
+    """
+    A fixed-timestep clock.
+
+    Parameters:
+        step (float): The simulation step in seconds.
+        max_steps (int): The most steps run for one tick. Time beyond that is
+            dropped, so a long stall (a window drag, a breakpoint) does not cause a
+            burst of catch-up steps.
+        timer (callable): Returns the current time in seconds.
+    """
+
+    def __init__(self, step=1 / SIMULATION_HZ, max_steps=MAX_STEPS_PER_TICK,
+                 timer=time.perf_counter):
+        if step <= 0:
+            raise ValueError("step must be positive")
+        self.step = step
+        self.max_steps = max_steps
+        self.timer = timer
+        self.accumulator = 0.0
+        self.last_time = None
+        self.steps = 0
+        self.dropped_time = 0.0
+
+    def tick(self, now=None):
+        """
+        Advance the clock to now.
+
+        Returns:
+            int: The number of simulation steps to run.
+        """
+        if now is None:
+            now = self.timer()
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += max(0.0, now - self.last_time)
+        self.last_time = now
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            self.dropped_time += (steps - self.max_steps) * self.step
+            self.accumulator -= (steps - self.max_steps) * self.step
+            steps = self.max_steps
+        self.accumulator -= steps * self.step
+        self.steps += steps
+        return steps
+
+    @property
+    def interpolation(self):
+        """How far the current time is between the last two simulation steps, from 0 to 1."""
+        return min(self.accumulator / self.step, 1.0)
+
+
+class FramePacer:
+    """
+    Paces frames to a target rate, skipping frames under load.
+
+    Parameters:
+        fps (float): The target frame rate. 0 disables sleeping.
+        max_skip (int): The most consecutive frames that may be skipped, so the
+            screen still updates when the machine cannot keep up at all.
+        timer (callable): Returns the current time in seconds.
+        sleep (callable): Sleeps for a number of seconds.
+    """
+
+    def __init__(self, fps=TARGET_FPS, max_skip=MAX_SKIPPED_FRAMES,
+                 timer=time.perf_counter, sleep=time.sleep):
+        self.interval = 1 / fps if fps else 0.0
+        self.max_skip = max_skip
+        self.timer = timer
+        self.sleep = sleep
+        self.deadline = None
+        self.consecutive_skips = 0
+        self.rendered = 0
+        self.skipped = 0
+
+    def should_render(self):
+        """Returns False when this frame should be skipped because the loop is behind schedule."""
+        now = self.timer()
+        if self.deadline is None:
+            self.deadline = now + self.interval
+        late = self.interval and now > self.deadline + self.interval
+        if late and self.consecutive_skips < self.max_skip:
+            self.consecutive_skips += 1
+            self.skipped += 1
+            return False
+        self.consecutive_skips = 0
+        self.rendered += 1
+        return True
+
+    def delay(self):
+        """
+        End the frame and schedule the next one.
+
+        Returns:
+            float: The seconds to sleep before starting the next frame.
+        """
+        now = self.timer()
+        if self.deadline is None:
+            self.deadline = now
+        remaining = self.deadline - now
+        if remaining < -self.interval * (self.max_skip + 1):
+            # Too far behind to catch up by skipping: start a new schedule from now
+            self.deadline = now
+            remaining = 0.0
+        self.deadline += self.interval
+        return max(0.0, remaining)
+
+    def wait(self):
+        """Ends the frame, sleeping until the next one is due."""
+        remaining = self.delay()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def stats(self):
+        total = self.rendered + self.skipped
+        return {
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / total if total else 0.0,
+        }
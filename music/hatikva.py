@@ -1,8 +1,12 @@
 """
 This file contains the notes for the melody and harmony of the Israeli national anthem, Hatikva.
 The notes are represented as tuples of the melody note and the harmony note.
+hatikva_score holds both lines as a structured score array, with the melody as
+track 0 and the harmony as track 1, every note a quarter note of 0.5 seconds.
 """
 
+from .score import make_score, merge_scores
+
 hatikva_melody = [
     "D4",
     "E4",
@@ -164,5 +168,10 @@ hatikva_harmony = [
     "D2"   # Root note of D minor chord
 ]
 
-hatikva_notes = list(zip(hatikva_melody, hatikva_harmony))
-hatikva_notes = hatikva_melody
\ No newline at end of file
+hatikva_chords = list(zip(hatikva_melody, hatikva_harmony))
+hatikva_notes = hatikva_melody
+
+hatikva_score = merge_scores(
+    make_score(hatikva_melody, 0.5, track=0),
+    make_score(hatikva_harmony, 0.5, track=1),
+)
\ No newline at end of file
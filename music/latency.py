@@ -0,0 +1,129 @@
+"""
+This module measures the latency between a key press and its first audible sample.
+
+Each note gets a LatencyTrace that is stamped with time.perf_counter() as it moves
+through the pipeline:
+
+    event: The KEYDOWN event was taken off the pygame queue.
+    synth_start: Synthesis of the note's first samples began.
+    synth_end: The first samples were ready.
+    submit: The block holding the first samples was handed to the output sink.
+
+The LatencyTracker keeps the last few hundred completed traces and reports
+p50/p95/p99 and a histogram for every interval between the stages.
+"""
+
+import threading
+import time
+from collections import deque
+import numpy as np
+
+STAGES = ("event", "synth_start", "synth_end", "submit")
+INTERVALS = (
+    ("queue", "event", "synth_start"),
+    ("synthesis", "synth_start", "synth_end"),
+    ("mix", "synth_end", "submit"),
+    ("total", "event", "submit"),
+)
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+WINDOW = 500
+
+
+class LatencyTrace:
+    """The timestamps of one note. A stage keeps the first time it is marked."""
+
+    __slots__ = ("note", "stamps", "tracker")
+
+    def __init__(self, note, tracker=None):
+        self.note = note
+        self.stamps = {}
+        self.tracker = tracker
+
+    def mark(self, stage):
+        if stage not in self.stamps:
+            self.stamps[stage] = time.perf_counter()
+
+    def finish(self):
+        """Hands the trace to its tracker, if it has one."""
+        if self.tracker is not None:
+            self.tracker.finish(self)
+
+    @property
+    def complete(self):
+        return all(stage in self.stamps for stage in STAGES)
+
+    def interval(self, start_stage, end_stage):
+        """Returns the time between two stages in milliseconds."""
+        return (self.stamps[end_stage] - self.stamps[start_stage]) * 1000
+
+
+class LatencyTracker:
+    """
+    Collects completed traces in a rolling window and reports their distribution.
+
+    Parameters:
+        window (int): The number of most recent notes kept for the statistics.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {name: deque(maxlen=window) for name, _, _ in INTERVALS}
+        self.notes_traced = 0
+        self._lock = threading.Lock()
+
+    def start(self, note):
+        """Creates a trace for note, stamped with the event stage."""
+        trace = LatencyTrace(note, self)
+        trace.mark("event")
+        return trace
+
+    def finish(self, trace):
+        """Adds a trace to the statistics. Incomplete traces are ignored."""
+        if not trace.complete:
+            return
+        with self._lock:
+            for name, start_stage, end_stage in INTERVALS:
+                self.samples[name].append(trace.interval(start_stage, end_stage))
+            self.notes_traced += 1
+
+    def percentiles(self):
+        """Returns {interval: {"count", "p50", "p95", "p99", "max"}} in milliseconds."""
+        with self._lock:
+            windows = {name: np.array(values) for name, values in self.samples.items()}
+        stats = {}
+        for name, values in windows.items():
+            if len(values) == 0:
+                stats[name] = {"count": 0}
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stats[name] = {"count": len(values), "p50": p50, "p95": p95,
+                           "p99": p99, "max": values.max()}
+        return stats
+
+    def histogram(self, interval="total"):
+        """Returns the bucket labels and counts of one interval in the rolling window."""
+        with self._lock:
+            values = np.array(self.samples[interval])
+        edges = np.array(HISTOGRAM_EDGES_MS, dtype=np.float64)
+        counts = np.bincount(np.searchsorted(edges, values, side="right"),
+                             minlength=len(edges) + 1)
+        labels = [f"< {edges[0]:g} ms"]
+        labels += [f"{low:g}-{high:g} ms" for low, high in zip(edges[:-1], edges[1:])]
+        labels.append(f">= {edges[-1]:g} ms")
+        return labels, counts
+
+    def report(self):
+        """Returns a printable summary of the latency statistics."""
+        lines = [f"Keypress latency over the last {self.window} notes "
+                 f"({self.notes_traced} traced):"]
+        for name, stats in self.percentiles().items():
+            if not stats["count"]:
+                lines.append(f"  {name:<10} no data")
+                continue
+            lines.append(f"  {name:<10} p50 {stats['p50']:7.2f} ms  p95 {stats['p95']:7.2f} ms  "
+                         f"p99 {stats['p99']:7.2f} ms  max {stats['max']:7.2f} ms")
+        labels, counts = self.histogram()
+        peak = max(counts.max(), 1)
+        for label, count in zip(labels, counts):
+            lines.append(f"  {label:>12} | {'#' * int(40 * count / peak):<40} {count}")
+        return "\n".join(lines)
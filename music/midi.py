@@ -0,0 +1,320 @@
+"""
+This module reads Standard MIDI Files and plays or renders their notes.
+
+The reader is pure Python and streams: the file is memory-mapped, every track is
+parsed lazily by its own generator, and the tracks are merged in time order with
+heapq.merge. Only the current event of each track is held in memory, so a file of
+any size is read in constant memory. Tick times are converted to seconds and sample
+offsets through the tempo map as the events go by.
+
+    read_events: Yields every note-on and note-off as a MidiEvent.
+    read_notes: Pairs the events into notes.
+    midi_to_score: Collects the notes into a score array of the score module.
+    MidiPlayer: Starts and releases StreamingVoices on an AudioEngine as the events
+        fall due, for live playback in music.music.
+    render_midi: Streams a file through an AudioEngine into an audio file.
+
+Formats 0 and 1 are supported, with metrical or SMPTE time division. Events other
+than notes and tempo changes are skipped.
+
+Usage:
+    python -m music.render output.flac --midi song.mid
+    python -m music.music --midi song.mid
+"""
+
+import heapq
+import mmap
+from collections import namedtuple
+import numpy as np
+from .engine import AudioEngine, FileSink
+from .render import measure_render
+from .score import MAX_VELOCITY, SCORE_DTYPE, sort_score
+
+DEFAULT_TEMPO = 500000  # Microseconds per quarter note, i.e. 120 beats per minute
+OFFLINE_BLOCK_SIZE = 128  # Events are applied at block boundaries, every 2.9 ms at 44.1 kHz
+OFFLINE_MAX_VOICES = 64
+
+# Internal event kinds
+_TEMPO, _NOTE_OFF, _NOTE_ON = 0, 1, 2
+
+MidiEvent = namedtuple("MidiEvent", "seconds sample on note velocity channel track")
+MidiEvent.__doc__ = """
+A note-on or note-off.
+
+    seconds (float): The time of the event.
+    sample (int): The time of the event in samples.
+    on (bool): True for a note-on, False for a note-off.
+    note (int): The MIDI note number.
+    velocity (int): The velocity, 1 to 127 for a note-on.
+    channel (int): The MIDI channel, 0 to 15.
+    track (int): The track of the event in the file.
+"""
+
+
+def _read_varlen(data, position):
+    value = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, position
+
+
+def _read_header(data):
+    """Returns the format, the time division and the (start, end) of every track chunk."""
+    if data[:4] != b"MThd":
+        raise ValueError("Not a Standard MIDI File")
+    length = int.from_bytes(data[4:8], "big")
+    file_format = int.from_bytes(data[8:10], "big")
+    division = int.from_bytes(data[12:14], "big")
+    tracks = []
+    position = 8 + length
+    while position + 8 <= len(data):
+        chunk_type = data[position:position + 4]
+        length = int.from_bytes(data[position + 4:position + 8], "big")
+        start = position + 8
+        # Chunks of unknown types are skipped
+        if chunk_type == b"MTrk":
+            tracks.append((start, min(start + length, len(data))))
+        position = start + length
+    return file_format, division, tracks
+
+
+def _track_events(data, start, end, track):
+    """
+    Parse one track chunk lazily.
+
+    Yields:
+        tuple: (tick, track, kind, channel, note, velocity). For a tempo change the
+        note field holds the tempo in microseconds per quarter note.
+    """
+    position = start
+    tick = 0
+    status = 0
+    try:
+        while position < end:
+            delta, position = _read_varlen(data, position)
+            tick += delta
+            byte = data[position]
+            if byte >= 0x80:
+                position += 1
+                if byte == 0xFF:
+                    meta_type = data[position]
+                    length, position = _read_varlen(data, position + 1)
+                    if meta_type == 0x51 and length == 3:
+                        tempo = int.from_bytes(data[position:position + 3], "big")
+                        yield tick, track, _TEMPO, 0, tempo, 0
+                    elif meta_type == 0x2F:  # End of track
+                        return
+                    position += length
+                    continue
+                if byte == 0xF0 or byte == 0xF7:  # System exclusive
+                    length, position = _read_varlen(data, position)
+                    position += length
+                    continue
+                if byte > 0xF0:
+                    raise ValueError(f"Unexpected status byte {byte:#x} in track {track}")
+                status = byte
+            elif not status:
+                raise ValueError(f"Missing status byte in track {track}")
+
+            # A data byte repeats the previous status (running status)
+            command = status & 0xF0
+            if command == 0xC0 or command == 0xD0:  # Program change, channel pressure
+                position += 1
+                continue
+            note = data[position]
+            velocity = data[position + 1]
+            position += 2
+            if command == 0x90 and velocity:
+                yield tick, track, _NOTE_ON, status & 0x0F, note, velocity
+            elif command == 0x80 or command == 0x90:
+                yield tick, track, _NOTE_OFF, status & 0x0F, note, 0
+    except IndexError:
+        raise ValueError(f"Track {track} is truncated") from None
+
+
+def read_events(path, sample_rate=44100):
+    """
+    Read the note events of a MIDI file in time order.
+
+    The file stays mapped until the generator is exhausted or closed.
+
+    Parameters:
+        path (str): The .mid file.
+        sample_rate (int): The sample rate of the sample offsets.
+
+    Yields:
+        MidiEvent: Every note-on and note-off. Events at the same time keep the
+        order of their tracks.
+
+    Raises:
+        ValueError: If the file is not a supported MIDI file or is truncated.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        file_format, division, tracks = _read_header(data)
+        if file_format == 2:
+            raise ValueError("Format 2 MIDI files are not supported")
+        smpte = bool(division & 0x8000)
+        if smpte:
+            frames_per_second = 256 - (division >> 8)
+            tick_seconds = 1 / (frames_per_second * (division & 0xFF))
+        elif division:
+            tick_seconds = DEFAULT_TEMPO / 1e6 / division
+        else:
+            raise ValueError("MIDI file has a time division of zero")
+
+        # Times are measured from the last tempo change, so rounding errors do not add up
+        base_tick = 0
+        base_seconds = 0.0
+        merged = heapq.merge(*(_track_events(data, start, end, number)
+                               for number, (start, end) in enumerate(tracks)))
+        for tick, track, kind, channel, note, velocity in merged:
+            seconds = base_seconds + (tick - base_tick) * tick_seconds
+            if kind == _TEMPO:
+                if not smpte:  # SMPTE time does not depend on the tempo
+                    base_tick, base_seconds = tick, seconds
+                    tick_seconds = note / 1e6 / division
+                continue
+            yield MidiEvent(seconds, round(seconds * sample_rate), kind == _NOTE_ON,
+                            note, velocity, channel, track)
+
+
+def read_notes(path, sample_rate=44100):
+    """
+    Pair the note events of a MIDI file into notes.
+
+    Notes are yielded when they end, so they come in order of their note-offs.
+    Notes still held at the end of the file end with the last event.
+
+    Yields:
+        tuple: (onset, duration, note, velocity, track), the times in seconds.
+    """
+    held = {}
+    seconds = 0.0
+    for event in read_events(path, sample_rate):
+        seconds = event.seconds
+        key = (event.track, event.channel, event.note)
+        if event.on:
+            held.setdefault(key, []).append((seconds, event.velocity))
+        elif key in held:
+            onset, velocity = held[key].pop(0)
+            if not held[key]:
+                del held[key]
+            yield onset, seconds - onset, event.note, velocity, event.track
+    for (track, _, note), starts in held.items():
+        for onset, velocity in starts:
+            yield onset, seconds - onset, note, velocity, track
+
+
+def midi_to_score(path):
+    """Returns the notes of a MIDI file as a score array, sorted by onset."""
+    return sort_score(np.fromiter(read_notes(path), dtype=SCORE_DTYPE))
+
+
+class MidiPlayer:
+    """
+    Plays MIDI events on an AudioEngine as they fall due.
+
+    Each note-on starts a StreamingVoice, with the volume scaled by the velocity, and
+    the matching note-off releases it. The events are pulled from the iterator one at
+    a time, so the player works on the stream of read_events without buffering it.
+
+    Parameters:
+        events (iterable): MidiEvents in time order, e.g. read_events(path).
+        engine (AudioEngine): The engine to play on.
+        on_note (callable): Called with the note number of every note-on.
+        volume (float): The volume of a note of velocity 127.
+        **voice_settings: The ADSR and waveform settings of the StreamingVoices.
+    """
+
+    def __init__(self, events, engine, on_note=None, volume=0.5, **voice_settings):
+        self.events = iter(events)
+        self.engine = engine
+        self.on_note = on_note
+        self.volume = volume
+        self.voice_settings = voice_settings
+        self.held = {}
+        self.dispatched = 0
+        self.pending = next(self.events, None)
+
+    @property
+    def finished(self):
+        """True once every event has been dispatched."""
+        return self.pending is None
+
+    def dispatch(self, event):
+        """Applies one event to the engine."""
+        key = (event.track, event.channel, event.note)
+        if event.on:
+            voice = self.engine.note_on(event.note,
+                                        volume=self.volume * event.velocity / MAX_VELOCITY,
+                                        **self.voice_settings)
+            self.held.setdefault(key, []).append(voice)
+            if self.on_note is not None:
+                self.on_note(event.note)
+        elif key in self.held:
+            self.engine.note_off(self.held[key].pop(0))
+            if not self.held[key]:
+                del self.held[key]
+        self.dispatched += 1
+
+    def update(self, sample):
+        """Dispatches every event due at or before the sample offset. Returns how many."""
+        count = 0
+        while self.pending is not None and self.pending.sample <= sample:
+            self.dispatch(self.pending)
+            self.pending = next(self.events, None)
+            count += 1
+        return count
+
+    def release_all(self):
+        """Releases the notes that are still held."""
+        for voices in self.held.values():
+            for voice in voices:
+                self.engine.note_off(voice)
+        self.held.clear()
+
+
+def render_midi(midi_path, output_path, sample_rate=44100, file_format=None,
+                block_size=OFFLINE_BLOCK_SIZE, max_voices=OFFLINE_MAX_VOICES, **voice_settings):
+    """
+    Render a MIDI file to an audio file.
+
+    The events are streamed from the file and the mixed blocks straight into the
+    output, so memory use does not grow with the length of the song.
+
+    Parameters:
+        midi_path (str): The .mid file.
+        output_path (str): The audio file; the extension selects the format.
+        sample_rate (int): The sample rate of the audio.
+        file_format (str): Override the file format, e.g. WAV or FLAC.
+        block_size (int): The frames mixed per block; events start at block boundaries.
+        max_voices (int): The polyphony cap.
+        **voice_settings: The volume, ADSR and waveform settings of the notes.
+
+    Returns:
+        dict: The render report, as returned by music.render.write_score.
+    """
+    counts = {}
+
+    def stream():
+        sink = FileSink(output_path, sample_rate, file_format)
+        engine = AudioEngine(sink, sample_rate, block_size, max_voices)
+        player = MidiPlayer(read_events(midi_path, sample_rate), engine, **voice_settings)
+        try:
+            while not player.finished or engine.active_voices:
+                player.update(sink.frames_written)
+                if player.finished:
+                    player.release_all()
+                sink.write(engine.render_block())
+        finally:
+            sink.close()
+        counts.update(events=player.dispatched, stolen_voices=engine.stolen_voices)
+        return sink.frames_written
+
+    report = measure_render(output_path, stream, sample_rate)
+    report.update(counts)
+    return report
+
@@ -1,128 +1,28 @@
 """
 This script generates a simple melody using the generate_note function and
-plays it using the simpleaudio library. The melody is based on the notes of
+plays it through the shared audio engine. The melody is based on the notes of
 the Israeli national anthem, "Hatikva". The script uses the notes_color module
 to convert note names to MIDI numbers and the particles module to create
-visual effects for each note played.
+visual effects for each note played. With --midi, a Standard MIDI File is
+streamed through the music.midi reader and played instead.
 """
 
-import threading
-import soundfile as sf
+import argparse
 import pygame
-import numpy as np
-import simpleaudio as sa
-from .graphics.particles import Particle, render_scene
+from .graphics.particles import Particle, ParticleSystem, ParticleScene
+from .graphics.quality import QualityGovernor, frame_budget_ms
+from .graphics.timing import TARGET_FPS
 from .graphics.notes_color import note_to_midi
-from .hatikva import hatikva_notes
+from .synth import generate_note, generate_single_note, render_single_note, validate_input
+from .engine import get_engine, shutdown_engine
+from .midi import MidiPlayer, read_events
+from .recorder import SessionRecorder
+from .sample_bank import warm_note_cache
+from .hatikva import hatikva_score
+from .score import track
 from .graphics.init import init_pygame
 
 
-def validate_input(note, duration, volume, sample_rate, attack_time, decay_time, sustain_level, release_time):
-    """
-    Validate the input parameters for the generate_note function.
-
-    Parameters:
-        note (int or list): The MIDI note number or a list of MIDI note numbers.
-        duration (float): The duration of the note in seconds.
-        volume (float): The volume of the note (0 to 1).
-        sample_rate (int): The sample rate of the audio.
-        attack_time (float): The attack time of the note in seconds.
-        decay_time (float): The decay time of the note in seconds.
-        sustain_level (float): The sustain level of the note (0 to 1).
-        release_time (float): The release time of the note in seconds.
-
-    Raises:
-        ValueError: If any of the input parameters are invalid.
-    """
-    if not 0 <= volume <= 1:
-        raise ValueError("Volume must be between 0 and 1")
-    if not 0 <= attack_time <= duration:
-        raise ValueError("Attack time must be between 0 and the duration")
-    if not 0 <= decay_time <= duration:
-        raise ValueError("Decay time must be between 0 and the duration")
-    if not 0 <= sustain_level <= 1:
-        raise ValueError("Sustain level must be between 0 and 1")
-    if not 0 <= release_time <= duration:
-        raise ValueError("Release time must be between 0 and the duration")
-    if isinstance(note, list):
-        for n in note:
-            if not isinstance(n, int):
-                raise ValueError(
-                    "Note must be an integer or a list of integers")
-    elif not isinstance(note, int):
-        raise ValueError("Note must be an integer or a list of integers")
-    if not isinstance(duration, (int, float)):
-        raise ValueError("Duration must be a number")
-
-
-def generate_single_note(
-    note=64,
-    duration=1.0,
-    volume=0.5,
-    sample_rate=44100,
-    attack_time=0.01,
-    decay_time=0.01,
-    sustain_level=0.7,
-    release_time=0.01,
-):
-    if duration < 0.1:
-        duration = 0.1
-    # adajust parametrs based on duration
-    if duration < attack_time + decay_time + release_time:
-        attack_time = duration * 0.1
-        decay_time = duration * 0.1
-        release_time = duration * 0.1
-    # Convert MIDI note number to frequency
-    base_frequency = 440 * 2 ** ((note - 69) / 12)
-
-    # Generate the time values
-    t_values = np.linspace(0, duration, int(duration * sample_rate), False)
-
-    # Generate the note with harmonics
-    note_samples = np.sin(base_frequency * t_values * 2 * np.pi)
-    for harmonic in range(2, 5):
-        note_samples += 0.5 / harmonic * \
-            np.sin(harmonic * base_frequency * t_values * 2 * np.pi)
-
-    # Generate the ADSR envelope
-    total_samples = len(note_samples)
-    attack_samples = int(attack_time * sample_rate)
-    decay_samples = int(decay_time * sample_rate)
-    release_samples = int(release_time * sample_rate)
-    sustain_samples = total_samples - attack_samples - decay_samples - release_samples
-
-    if sustain_samples < 0:
-        raise ValueError(
-            "Invalid envelope times: attack + decay + release > duration")
-
-    envelope = np.concatenate(
-        [
-            np.linspace(0, 1, attack_samples),  # Attack
-            np.linspace(1, sustain_level, decay_samples),  # Decay
-            np.full(sustain_samples, sustain_level),  # Sustain
-            np.linspace(sustain_level, 0, release_samples),  # Release
-        ]
-    )
-
-    # Apply the envelope to the note
-    note_samples *= envelope
-
-    # Convert to 16-bit PCM audio
-    audio = note_samples * (2**15 - 1) * volume
-    return audio.astype(np.int16)
-
-
-def generate_note(note, *args, **kwargs):
-    if isinstance(note, list):
-        # Generate all notes in the chord and return them as a list
-        return [
-            generate_single_note(n, *args, **kwargs)
-            for n in note
-        ]
-    else:
-        return [generate_single_note(note, *args, **kwargs)]
-
-
 def notes_to_midi(chords):
     """
     Convert a list of chords in note names to a list of chords in MIDI numbers.
@@ -146,8 +46,13 @@ def notes_to_midi(chords):
     return midi_chords
 
 
-hatikva_notes = notes_to_midi(hatikva_notes)
-hatikva_durations = [0.5] * len(hatikva_notes)  # Each note is a quarter note
+# The note lists are read from the score columns, without a lookup per note name
+hatikva_melody = track(hatikva_score, 0)
+hatikva_harmony = track(hatikva_score, 1)
+hatikva_notes = [[pitch] for pitch in hatikva_melody["pitch"].tolist()]
+hatikva_chords = [list(chord) for chord in zip(hatikva_melody["pitch"].tolist(),
+                                               hatikva_harmony["pitch"].tolist())]
+hatikva_durations = hatikva_melody["duration"].tolist()  # Each note is a quarter note
 
 
 def handle_event(event):
@@ -171,21 +76,37 @@ def get_note_and_duration(cur_note):
     return note, duration
 
 
-def generate_and_play_note(note=64, duration=1.0, volume=0.5, sample_rate=44100, attack_time=0.01, decay_time=0.01, sustain_level=0.7, release_time=0.01):
-    # Generate the notes
-    notes = generate_note(note, duration=duration, volume=volume, sample_rate=sample_rate,
+def generate_and_play_note(note=64, duration=1.0, volume=0.5, sample_rate=44100, attack_time=0.01, decay_time=0.01, sustain_level=0.7, release_time=0.01, trace=None):
+    # Generate the note or the whole chord as one buffer
+    if trace is not None:
+        trace.mark("synth_start")
+    note_samples = generate_note(note, duration=duration, volume=volume, sample_rate=sample_rate,
                           attack_time=attack_time, decay_time=decay_time, sustain_level=sustain_level, release_time=release_time)
 
-    # Play each note in a separate thread
-    for note_samples in notes:
-        threading.Thread(target=sa.play_buffer, args=(
-            note_samples, 1, 2, 44100)).start()
+    if trace is not None:
+        trace.mark("synth_end")
+
+    # Mix it into the shared output stream
+    get_engine().play(note_samples, trace=trace)
+
+    return note_samples
 
-    return notes[0] if notes else None
+
+def load_sample_banks():
+    """Maps the song's single notes from the on-disk sample banks into the note cache."""
+    for duration in sorted(set(hatikva_durations)):
+        notes = {chord[0] for chord, note_duration in zip(hatikva_notes, hatikva_durations)
+                 if len(chord) == 1 and note_duration == duration}
+        try:
+            warm_note_cache(notes, duration=duration)
+        except OSError as e:
+            print(f"Sample bank unavailable ({e}), notes will be synthesized")
 
 
 def append_particle(particles, note):
-    if particles is not None:
+    if isinstance(particles, ParticleSystem):
+        particles.emit(0, 0, 0, note)
+    elif particles is not None:
         particles.append(Particle(0, 0, 0, note))
 
 
@@ -208,30 +129,56 @@ def play_note(cur_note, next_note_time, all_samples=None, particles=None):
         note, duration = get_note_and_duration(cur_note)
         note_samples = generate_and_play_note(note, duration)
         append_particle(particles, note)
-        all_samples = update_all_samples(all_samples, note_samples)
+        if all_samples is not None:
+            all_samples = update_all_samples(all_samples, note_samples)
         cur_note, next_note_time = update_note_and_time(cur_note, duration)
     return cur_note, next_note_time, all_samples
 
 
-def main():
+def main(seed=None, midi=None):
+    if midi is None:
+        load_sample_banks()
     init_pygame()
     running = True
     cur_note = 0
     next_note_time = pygame.time.get_ticks()
-    all_samples = []
-    particles = []
+    # A fixed seed replays the same particles, for comparable benchmark runs
+    particles = ParticleSystem(rng=seed)
+    scene = ParticleScene(particles, governor=QualityGovernor(particles, budget_ms=frame_budget_ms(TARGET_FPS)))
+    # Stream the mixed output to disk instead of keeping every note in memory
+    recorder = SessionRecorder("output.wav")
+    engine = get_engine()
+    engine.add_tap(recorder.write)
+    player = None
+    if midi is not None:
+        # The events are read lazily as they fall due, however long the file is
+        player = MidiPlayer(read_events(midi, engine.sample_rate), engine,
+                            on_note=lambda note: append_particle(particles, note))
+        start_time = get_current_time()
 
     while running:
         for event in pygame.event.get():
             running = handle_event(event)
-        cur_note, next_note_time, all_samples = play_note(
-            cur_note, next_note_time, all_samples, particles)
-        render_scene(particles)
-
-    sf.write("output.wav", all_samples, 44100)
+        if player is None:
+            cur_note, next_note_time, _ = play_note(
+                cur_note, next_note_time, particles=particles)
+        else:
+            player.update((get_current_time() - start_time) * engine.sample_rate // 1000)
+            if player.finished:
+                # Release the notes the file leaves held, as render_midi does
+                player.release_all()
+        scene.frame()
+
+    shutdown_engine()
+    recorder.close()
     pygame.quit()
     quit()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Play Hatikva with particle effects.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed the particle effects so runs are reproducible")
+    parser.add_argument("--midi", default=None, help="Play this MIDI file instead of Hatikva")
+    args = parser.parse_args()
+    main(args.seed, args.midi)
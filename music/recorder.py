@@ -0,0 +1,164 @@
+"""
+This module records a live session to disk with bounded memory.
+
+The SessionRecorder collects the mixed output in fixed-size chunks and hands them to
+a background thread that appends them to the file with soundfile's streaming
+writer. Only a bounded queue of chunks is ever kept in memory, so a session can run
+for hours, and everything up to the last full chunk is already on disk if the
+process crashes. Files can be rotated by size or duration. If the file cannot be
+opened or written, the recorder stops, keeps the exception in its error attribute and
+reports it when closed; the session itself carries on.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import numpy as np
+import soundfile as sf
+
+CHUNK_FRAMES = 44100  # One second per chunk at 44.1 kHz
+MAX_QUEUED_CHUNKS = 16
+
+
+class SessionRecorder:
+    """
+    Streams int16 audio blocks to a file from a background thread.
+
+    Parameters:
+        path (str): The output file. The extension selects the format. When
+            rotation is enabled the files are named <name>-0001<ext>, <name>-0002<ext>...
+        sample_rate (int): The sample rate of the audio.
+        channels (int): The number of channels of the blocks.
+        chunk_frames (int): The number of frames collected before a chunk is queued.
+        max_queued_chunks (int): The queue bound. When the disk falls behind, new
+            chunks are dropped and counted in dropped_chunks instead of using more memory.
+        max_seconds (float): Start a new file after this many seconds, if set.
+        max_bytes (int): Start a new file after this many bytes of 16-bit PCM, if set.
+
+    Attributes:
+        error (Exception): The exception that stopped the writer thread, or None.
+    """
+
+    def __init__(self, path="output.wav", sample_rate=44100, channels=1,
+                 chunk_frames=CHUNK_FRAMES, max_queued_chunks=MAX_QUEUED_CHUNKS,
+                 max_seconds=None, max_bytes=None):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_frames = chunk_frames
+        self.max_file_frames = None
+        if max_seconds is not None:
+            self.max_file_frames = int(max_seconds * sample_rate)
+        if max_bytes is not None:
+            byte_frames = max_bytes // (2 * channels)
+            self.max_file_frames = min(self.max_file_frames or byte_frames, byte_frames)
+        if self.max_file_frames is not None and self.max_file_frames < 1:
+            raise ValueError("The rotation limit must allow at least one frame per file")
+
+        self.files = []
+        self.frames_written = 0
+        self.dropped_chunks = 0
+        self.error = None
+        self._chunk = np.zeros((chunk_frames, channels), dtype=np.int16)
+        self._chunk_fill = 0
+        self._queue = queue.Queue(max_queued_chunks)
+        self._file = None
+        self._file_frames = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, block):
+        """Adds a block of int16 frames to the recording. Safe to call from the audio thread."""
+        if self._closed or self.error is not None:
+            return
+        block = np.asarray(block, dtype=np.int16).reshape(-1, self.channels)
+        while len(block):
+            count = min(len(block), self.chunk_frames - self._chunk_fill)
+            self._chunk[self._chunk_fill:self._chunk_fill + count] = block[:count]
+            self._chunk_fill += count
+            block = block[count:]
+            if self._chunk_fill == self.chunk_frames:
+                self._submit(self._chunk)
+                self._chunk = np.empty_like(self._chunk)
+                self._chunk_fill = 0
+
+    def close(self):
+        """Flushes the partial chunk, waits for the writer thread and closes the file."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._chunk_fill:
+            self._put_final(self._chunk[:self._chunk_fill])
+        self._put_final(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+        if self.error is not None:
+            print(f"Recording to {self.path} failed after {self.frames_written} frames: "
+                  f"{self.error}")
+
+    def _put_final(self, item):
+        """Queues item unless the writer thread has stopped, which would never take it."""
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _submit(self, chunk):
+        try:
+            self._queue.put_nowait(chunk)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def _file_path(self):
+        if self.max_file_frames is None:
+            return self.path
+        name, ext = os.path.splitext(self.path)
+        return f"{name}-{len(self.files) + 1:04d}{ext}"
+
+    def _open_next_file(self):
+        if self._file is not None:
+            self._file.close()
+        path = self._file_path()
+        self._file = sf.SoundFile(path, "w", samplerate=self.sample_rate,
+                                  channels=self.channels)
+        self._file_frames = 0
+        self.files.append(path)
+
+    def _run(self):
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                while len(chunk):
+                    if self._file is None or (self.max_file_frames is not None
+                                              and self._file_frames >= self.max_file_frames):
+                        self._open_next_file()
+                    count = len(chunk)
+                    if self.max_file_frames is not None:
+                        count = min(count, self.max_file_frames - self._file_frames)
+                    self._file.write(chunk[:count])
+                    self._file_frames += count
+                    self.frames_written += count
+                    chunk = chunk[count:]
+        except Exception as e:
+            # Stop recording; write() drops further blocks and close() reports the error
+            self.error = e
+        finally:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
@@ -0,0 +1,229 @@
+"""
+This module renders a score to an audio file faster than real time.
+
+music.music.main can only record Hatikva by playing it through the pygame loop. The
+render_score function instead places every note sample-accurately into one
+preallocated buffer with overlap-add, and write_score saves the result as WAV, FLAC
+or any other format soundfile supports. No display or audio device is needed.
+render_score_array and write_score_array do the same for a structured score array
+from the score module.
+
+Usage:
+    python -m music.render output.flac --chords
+    python -m music.render output.flac --score arrangement.npy --start 30 --end 60
+    python -m music.render output.flac --midi song.mid
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import soundfile as sf
+from .engine import soft_limit
+from .score import MAX_VELOCITY, chord_bounds, load_score, time_slice, track
+from .synth import generate_note
+
+DEFAULT_NOTE_SETTINGS = {
+    "volume": 0.5,
+    "attack_time": 0.01,
+    "decay_time": 0.01,
+    "sustain_level": 0.7,
+    "release_time": 0.01,
+}
+
+
+def note_onsets(durations, sample_rate=44100):
+    """Returns the start sample of each note when the notes are played back to back."""
+    starts = np.concatenate([[0.0], np.cumsum(durations, dtype=np.float64)[:-1]])
+    return np.round(starts * sample_rate).astype(np.int64)
+
+
+def render_score(notes, durations, sample_rate=44100, onsets=None, **note_settings):
+    """
+    Render a score into a single int16 buffer.
+
+    Parameters:
+        notes (list): The MIDI note numbers or chords (lists of MIDI note numbers).
+        durations (list): The duration of each note in seconds.
+        sample_rate (int): The sample rate of the audio.
+        onsets (array-like): The start sample of each note. Defaults to playing the
+            notes back to back.
+        **note_settings: The volume and ADSR settings passed to generate_note.
+
+    Returns:
+        np.ndarray: The mixed int16 samples.
+    """
+    if len(notes) != len(durations):
+        raise ValueError("notes and durations must have the same length")
+    if not notes:
+        return np.zeros(0, dtype=np.int16)
+    settings = dict(DEFAULT_NOTE_SETTINGS, **note_settings)
+    if onsets is None:
+        onsets = note_onsets(durations, sample_rate)
+    onsets = np.asarray(onsets, dtype=np.int64)
+
+    # Notes shorter than 0.1 s are stretched by generate_single_note
+    lengths = (np.maximum(durations, 0.1) * sample_rate).astype(np.int64)
+    mix = np.zeros(int((onsets + lengths).max()), dtype=np.float32)
+    for note, duration, start in zip(notes, durations, onsets):
+        samples = generate_note(note, duration=duration, sample_rate=sample_rate, **settings)
+        mix[start:start + len(samples)] += samples
+
+    mix /= 32767
+    soft_limit(mix)
+    return (mix * 32767).astype(np.int16)
+
+
+def render_score_array(score, sample_rate=44100, offset=0.0, **note_settings):
+    """
+    Render a structured score array into a single int16 buffer.
+
+    Notes with the same onset, duration and velocity are rendered together as one
+    chord, and each note's volume is the volume setting scaled by its velocity.
+
+    Parameters:
+        score (np.ndarray): A score of SCORE_DTYPE, sorted by onset.
+        sample_rate (int): The sample rate of the audio.
+        offset (float): The time in seconds at the start of the buffer, e.g. the
+            start of a time_slice. A rest before the first note is kept.
+        **note_settings: The volume and ADSR settings passed to generate_note.
+
+    Returns:
+        np.ndarray: The mixed int16 samples.
+
+    Raises:
+        ValueError: If a note starts before offset.
+    """
+    if len(score) == 0:
+        return np.zeros(0, dtype=np.int16)
+    settings = dict(DEFAULT_NOTE_SETTINGS, **note_settings)
+    volume = settings.pop("volume")
+    bounds = chord_bounds(score)
+    firsts = bounds[:-1]
+    onsets = np.round((score["onset"][firsts] - offset) * sample_rate).astype(np.int64)
+    if onsets[0] < 0:
+        raise ValueError(f"The score starts at {score['onset'][0]} s, before the offset {offset} s")
+    # Round away the float32 noise so equal durations share note cache entries
+    durations = np.round(score["duration"][firsts].astype(np.float64), 6)
+    volumes = volume * score["velocity"][firsts] / MAX_VELOCITY
+    lengths = (np.maximum(durations, 0.1) * sample_rate).astype(np.int64)
+    mix = np.zeros(int((onsets + lengths).max()), dtype=np.float32)
+    pitches = score["pitch"]
+    for first, last, start, duration, note_volume in zip(
+            firsts.tolist(), bounds[1:].tolist(), onsets.tolist(), durations.tolist(),
+            volumes.tolist()):
+        chord = pitches[first:last].tolist()
+        samples = generate_note(chord if len(chord) > 1 else chord[0], duration=duration,
+                                volume=note_volume, sample_rate=sample_rate, **settings)
+        mix[start:start + len(samples)] += samples
+
+    mix /= 32767
+    soft_limit(mix)
+    return (mix * 32767).astype(np.int16)
+
+
+def write_score(path, notes, durations, sample_rate=44100, file_format=None, **note_settings):
+    """
+    Render a score and write it to an audio file.
+
+    Returns:
+        dict: The render report with the audio duration, the render time, the
+        realtime factor and the peak traced memory in bytes.
+    """
+    return _write_rendered(
+        path, lambda: render_score(notes, durations, sample_rate, **note_settings),
+        sample_rate, file_format)
+
+
+def write_score_array(path, score, sample_rate=44100, file_format=None, offset=0.0,
+                      **note_settings):
+    """Render a structured score array and write it to an audio file, like write_score."""
+    return _write_rendered(
+        path, lambda: render_score_array(score, sample_rate, offset, **note_settings),
+        sample_rate, file_format)
+
+
+def _write_rendered(path, render, sample_rate, file_format):
+    def write():
+        audio = render()
+        sf.write(path, audio, sample_rate, format=file_format)
+        return len(audio)
+
+    return measure_render(path, write, sample_rate)
+
+
+def measure_render(path, render, sample_rate):
+    """
+    Time a render to a file and trace its peak memory.
+
+    Parameters:
+        path (str): The output file, recorded in the report.
+        render (callable): Writes the file and returns the number of frames written.
+        sample_rate (int): The sample rate of the audio.
+
+    Returns:
+        dict: The render report with the audio duration, the render time, the
+        realtime factor and the peak traced memory in bytes.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    frames = render()
+    render_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+
+    audio_duration = frames / sample_rate
+    return {
+        "path": str(path),
+        "audio_seconds": audio_duration,
+        "render_seconds": render_time,
+        "realtime_factor": audio_duration / render_time if render_time else float("inf"),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def print_report(report):
+    print(f"Rendered {report['audio_seconds']:.2f} s of audio to {report['path']} "
+          f"in {report['render_seconds']:.3f} s "
+          f"({report['realtime_factor']:.0f}x realtime, "
+          f"peak memory {report['peak_memory_bytes'] / 2**20:.1f} MiB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render Hatikva to an audio file offline.")
+    parser.add_argument("output", nargs="?", default="output.wav",
+                        help="The output file; the extension selects the format")
+    parser.add_argument("--format", dest="file_format", default=None,
+                        help="Override the file format, e.g. WAV or FLAC")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--chords", action="store_true",
+                        help="Render the melody together with the harmony line")
+    parser.add_argument("--score", help="Render this .npy score instead of Hatikva")
+    parser.add_argument("--start", type=float, default=0.0,
+                        help="Only render the notes starting at or after this time in seconds")
+    parser.add_argument("--end", type=float, default=None,
+                        help="Only render the notes starting before this time in seconds")
+    parser.add_argument("--midi", help="Stream this MIDI file to the output instead")
+    args = parser.parse_args(argv)
+
+    if args.midi:
+        from .midi import render_midi
+        print_report(render_midi(args.midi, args.output, args.sample_rate, args.file_format))
+        return
+    if args.score:
+        score = load_score(args.score)
+    else:
+        from .hatikva import hatikva_score
+        score = hatikva_score if args.chords else track(hatikva_score, 0)
+    score = time_slice(score, args.start, args.end)
+    report = write_score_array(args.output, score, args.sample_rate, args.file_format,
+                               offset=args.start)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
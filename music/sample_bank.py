@@ -0,0 +1,192 @@
+"""
+This module stores rendered notes on disk, so the front-ends start without
+resynthesizing them.
+
+A bank holds every note of one instrument configuration (renderer, timbre, duration,
+ADSR settings) as rows of a single (notes, samples) int16 .npy file. At startup the
+file is memory-mapped read-only, so the rows are used in place without copying or
+synthesis. Beside it, a small JSON index records the parameters and the row of each
+note.
+
+The file names contain a hash of the parameters: changing any of them selects a
+different bank, which is built automatically on first use. Only the
+MAX_BANKS_PER_NAME most recently used banks of each name are kept. Files are
+written to a temporary name and moved into place, index last, so an interrupted
+build is never loaded. Bump BANK_VERSION when the synthesis code changes the
+rendered output.
+
+The default directory is ~/.cache/music/sample_banks, or $MUSIC_SAMPLE_BANK_DIR.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+from .cache import note_cache
+from .synth import render_single_note
+
+BANK_VERSION = 1
+MAX_BANKS_PER_NAME = 8
+
+# Defaults of generate_single_note, in the order of its cache key
+SYNTH_SETTINGS = {
+    "duration": 1.0,
+    "volume": 0.5,
+    "sample_rate": 44100,
+    "attack_time": 0.01,
+    "decay_time": 0.01,
+    "sustain_level": 0.7,
+    "release_time": 0.01,
+    "waveform": "harmonic",
+}
+
+
+def default_directory():
+    return Path(os.environ.get("MUSIC_SAMPLE_BANK_DIR",
+                               Path.home() / ".cache" / "music" / "sample_banks"))
+
+
+def bank_key(name, notes, params):
+    """Returns the hash that identifies a bank's parameters."""
+    description = json.dumps(
+        {"version": BANK_VERSION, "name": name, "notes": notes, "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+
+class SampleBank:
+    """
+    The memory-mapped notes of one bank.
+
+    Parameters:
+        samples (numpy.ndarray): The read-only (notes, samples) int16 array.
+        notes (list): The MIDI note of each row.
+        path (Path): The .npy file.
+    """
+
+    def __init__(self, samples, notes, path):
+        self.samples = samples
+        self.notes = notes
+        self.path = path
+        self.index = {note: row for row, note in enumerate(notes)}
+
+    def __len__(self):
+        return len(self.notes)
+
+    def __contains__(self, note):
+        return note in self.index
+
+    def get(self, note):
+        """Returns the samples of a note, a read-only view into the mapped file."""
+        return self.samples[self.index[note]]
+
+
+def _write_atomic(path, write):
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temporary, "wb") as file:
+            write(file)
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+
+
+def _load(path, index_path, key):
+    """Maps a complete bank, or returns None if it is missing or does not match its index."""
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+        if index.get("key") != key:
+            return None
+        samples = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if list(samples.shape) != index["shape"] or samples.dtype != np.int16:
+        return None
+    # The index modification time records when the bank was last used, for pruning
+    try:
+        os.utime(index_path)
+    except OSError:
+        pass
+    return SampleBank(samples, index["notes"], path)
+
+
+def _prune(directory, name, keep):
+    """Deletes the banks of name beyond the keep most recently used."""
+    indexes = sorted(directory.glob(f"{name}-*.json"),
+                     key=lambda path: path.stat().st_mtime, reverse=True)
+    for index_path in indexes[keep:]:
+        for path in (index_path, index_path.with_suffix(".npy")):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def open_bank(name, notes, render, params=None, directory=None, prune=True):
+    """
+    Map the bank of the given notes and parameters, building it first if needed.
+
+    Parameters:
+        name (str): Identifies the renderer, e.g. "synth".
+        notes (iterable): The MIDI notes of the bank.
+        render (callable): Called as render(note, **params); returns the int16
+            samples of a note. Every note must have the same length.
+        params (dict): The JSON-serializable synthesis parameters.
+        directory (str): Where the banks are stored. Defaults to default_directory().
+        prune (bool): Delete the least recently used banks of the same name beyond
+            MAX_BANKS_PER_NAME.
+
+    Returns:
+        SampleBank: The mapped bank.
+
+    Raises:
+        OSError: If the bank cannot be written, or cannot be mapped once written.
+    """
+    notes = sorted({int(note) for note in notes})
+    params = dict(params or {})
+    key = bank_key(name, notes, params)
+    directory = Path(directory) if directory is not None else default_directory()
+    path = directory / f"{name}-{key}.npy"
+    index_path = path.with_suffix(".json")
+
+    bank = _load(path, index_path, key)
+    if bank is None:
+        directory.mkdir(parents=True, exist_ok=True)
+        samples = np.stack([np.asarray(render(note, **params), dtype=np.int16)
+                            for note in notes])
+        index = {"version": BANK_VERSION, "name": name, "key": key, "params": params,
+                 "notes": notes, "shape": list(samples.shape)}
+        _write_atomic(path, lambda file: np.save(file, samples))
+        # The index goes last: a bank is only loaded once its index exists
+        _write_atomic(index_path, lambda file: file.write(json.dumps(index, indent=2).encode()))
+        bank = _load(path, index_path, key)
+        if bank is None:
+            raise OSError(f"Could not map the sample bank {path} after writing it")
+    if prune:
+        _prune(directory, name, MAX_BANKS_PER_NAME)
+    return bank
+
+
+def open_synth_bank(notes, directory=None, **settings):
+    """Maps the bank of single notes rendered by music.synth with the given settings."""
+    params = dict(SYNTH_SETTINGS, **settings)
+    return open_bank("synth", notes, render_single_note, params, directory)
+
+
+def warm_note_cache(notes, cache=note_cache, directory=None, **settings):
+    """
+    Fill the note cache from the synth bank, so generate_single_note with the same
+    settings finds every note without rendering it.
+
+    Returns:
+        SampleBank: The mapped bank.
+    """
+    bank = open_synth_bank(notes, directory, **settings)
+    params = dict(SYNTH_SETTINGS, **settings)
+    for note in bank.notes:
+        cache.put((note, *params.values()), bank.get(note))
+    return bank
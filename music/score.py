@@ -0,0 +1,143 @@
+"""
+This module stores scores as NumPy structured arrays.
+
+A score is a one-dimensional array of SCORE_DTYPE, one record per note:
+
+    onset (float64): The start time in seconds.
+    duration (float32): The length in seconds.
+    pitch (int16): The MIDI note number.
+    velocity (uint8): The MIDI velocity, 1 to 127; it scales the note volume.
+    track (uint16): The voice or instrument the note belongs to.
+
+Records are kept sorted by onset, so a time range is found with a binary search and
+chords are runs of records with the same onset. A score of any length is a single
+contiguous buffer: it is saved as a .npy file and loaded memory-mapped, and the
+renderers work on its columns without creating a Python object per note.
+"""
+
+import numpy as np
+from .graphics.notes_color import note_to_midi
+
+SCORE_DTYPE = np.dtype([
+    ("onset", np.float64),
+    ("duration", np.float32),
+    ("pitch", np.int16),
+    ("velocity", np.uint8),
+    ("track", np.uint16),
+])
+
+MAX_VELOCITY = 127
+
+
+def names_to_midi(names):
+    """
+    Convert note names to MIDI numbers in bulk.
+
+    Each distinct name is looked up once, so the cost is independent of how often
+    the names repeat.
+
+    Raises:
+        ValueError: If a name is not a known note.
+    """
+    unique, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    try:
+        numbers = np.array([note_to_midi[name] for name in unique], dtype=np.int16)
+    except KeyError as e:
+        raise ValueError(f"Unknown note name {e.args[0]!r}") from None
+    return numbers[inverse.reshape(-1)]
+
+
+def sort_score(score):
+    """Returns the score sorted by onset, keeping the order of notes with equal onsets."""
+    return score[np.argsort(score["onset"], kind="stable")]
+
+
+def make_score(pitches, durations, onsets=None, velocity=MAX_VELOCITY, track=0):
+    """
+    Build a score from columns.
+
+    Parameters:
+        pitches (array-like): MIDI numbers or note names.
+        durations (float or array-like): The duration of each note in seconds.
+        onsets (array-like): The start of each note in seconds. Defaults to playing
+            the notes back to back.
+        velocity (int or array-like): The velocity of each note.
+        track (int or array-like): The track of each note.
+
+    Returns:
+        np.ndarray: The score, sorted by onset.
+    """
+    pitches = np.asarray(pitches)
+    if pitches.dtype.kind in "US":
+        pitches = names_to_midi(pitches)
+    score = np.zeros(len(pitches), dtype=SCORE_DTYPE)
+    score["pitch"] = pitches
+    score["duration"] = durations
+    if onsets is None:
+        ends = np.cumsum(np.broadcast_to(np.asarray(durations, dtype=np.float64), len(score)))
+        onsets = ends - score["duration"]
+    score["onset"] = onsets
+    score["velocity"] = velocity
+    score["track"] = track
+    return sort_score(score)
+
+
+def merge_scores(*scores):
+    """Combines scores, e.g. the tracks of an arrangement, into one sorted score."""
+    return sort_score(np.concatenate(scores))
+
+
+def time_slice(score, start, end=None):
+    """Returns the notes starting in [start, end) seconds, as a view of the score."""
+    onsets = score["onset"]
+    first = np.searchsorted(onsets, start, side="left")
+    last = len(score) if end is None else np.searchsorted(onsets, end, side="left")
+    return score[first:last]
+
+
+def track(score, number):
+    """Returns the notes of one track."""
+    return score[score["track"] == number]
+
+
+def chord_bounds(score):
+    """
+    Find the chords of a score: runs of notes with the same onset, duration and velocity.
+
+    Returns:
+        np.ndarray: The start index of every chord, followed by len(score).
+    """
+    if len(score) == 0:
+        return np.zeros(1, dtype=np.intp)
+    changed = ((np.diff(score["onset"]) != 0)
+               | (np.diff(score["duration"]) != 0)
+               | (np.diff(score["velocity"]) != 0))
+    return np.concatenate([[0], np.flatnonzero(changed) + 1, [len(score)]])
+
+
+def end_time(score):
+    """Returns the time in seconds at which the last note ends."""
+    if len(score) == 0:
+        return 0.0
+    return float((score["onset"] + score["duration"]).max())
+
+
+def save_score(path, score):
+    """Saves a score as a .npy file."""
+    np.save(path, np.ascontiguousarray(score, dtype=SCORE_DTYPE))
+
+
+def load_score(path, mmap=True):
+    """
+    Load a score saved with save_score.
+
+    Parameters:
+        mmap (bool): Map the file read-only instead of reading it into memory.
+
+    Raises:
+        ValueError: If the file does not hold a score.
+    """
+    score = np.load(path, mmap_mode="r" if mmap else None)
+    if score.dtype != SCORE_DTYPE or score.ndim != 1:
+        raise ValueError(f"{path} does not contain a score")
+    return score
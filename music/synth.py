@@ -0,0 +1,203 @@
+"""
+This module renders notes into 16-bit PCM buffers.
+
+It is the synthesis core shared by the music player, the keyboard front-ends and
+the offline tools. Oscillators come from the wavetable module and every note is
+shaped by an ADSR envelope. Chords are rendered as one buffer in a single
+vectorized pass. Rendered notes and chords are memoized in the note cache, so
+repeated notes cost a lookup instead of a resynthesis.
+"""
+
+import numpy as np
+from .cache import note_cache
+from .wavetable import get_wavetable, midi_to_frequency
+
+
+def validate_input(note, duration, volume, sample_rate, attack_time, decay_time, sustain_level, release_time):
+    """
+    Validate the input parameters for the generate_note function.
+
+    Parameters:
+        note (int or list): The MIDI note number or a list of MIDI note numbers.
+        duration (float): The duration of the note in seconds.
+        volume (float): The volume of the note (0 to 1).
+        sample_rate (int): The sample rate of the audio.
+        attack_time (float): The attack time of the note in seconds.
+        decay_time (float): The decay time of the note in seconds.
+        sustain_level (float): The sustain level of the note (0 to 1).
+        release_time (float): The release time of the note in seconds.
+
+    Raises:
+        ValueError: If any of the input parameters are invalid.
+    """
+    if not 0 <= volume <= 1:
+        raise ValueError("Volume must be between 0 and 1")
+    if not 0 <= attack_time <= duration:
+        raise ValueError("Attack time must be between 0 and the duration")
+    if not 0 <= decay_time <= duration:
+        raise ValueError("Decay time must be between 0 and the duration")
+    if not 0 <= sustain_level <= 1:
+        raise ValueError("Sustain level must be between 0 and 1")
+    if not 0 <= release_time <= duration:
+        raise ValueError("Release time must be between 0 and the duration")
+    if isinstance(note, list):
+        for n in note:
+            if not isinstance(n, int):
+                raise ValueError(
+                    "Note must be an integer or a list of integers")
+    elif not isinstance(note, int):
+        raise ValueError("Note must be an integer or a list of integers")
+    if not isinstance(duration, (int, float)):
+        raise ValueError("Duration must be a number")
+
+
+def adsr_envelope(total_samples, sample_rate, attack_time, decay_time, sustain_level, release_time):
+    """
+    Build an ADSR envelope of total_samples samples.
+
+    Raises:
+        ValueError: If attack + decay + release do not fit in total_samples.
+    """
+    attack_samples = int(attack_time * sample_rate)
+    decay_samples = int(decay_time * sample_rate)
+    release_samples = int(release_time * sample_rate)
+    sustain_samples = total_samples - attack_samples - decay_samples - release_samples
+
+    if sustain_samples < 0:
+        raise ValueError(
+            "Invalid envelope times: attack + decay + release > duration")
+
+    return np.concatenate(
+        [
+            np.linspace(0, 1, attack_samples),  # Attack
+            np.linspace(1, sustain_level, decay_samples),  # Decay
+            np.full(sustain_samples, sustain_level),  # Sustain
+            np.linspace(sustain_level, 0, release_samples),  # Release
+        ]
+    )
+
+
+def generate_single_note(
+    note=64,
+    duration=1.0,
+    volume=0.5,
+    sample_rate=44100,
+    attack_time=0.01,
+    decay_time=0.01,
+    sustain_level=0.7,
+    release_time=0.01,
+    waveform="harmonic",
+    cache=note_cache,
+):
+    """
+    Return the int16 samples of a single note, reusing a cached buffer when possible.
+
+    The returned array is read-only because it is shared with the cache. Pass
+    cache=None to always render a fresh, writable buffer.
+    """
+    key = (note, duration, volume, sample_rate,
+           attack_time, decay_time, sustain_level, release_time, waveform)
+    if cache is None:
+        return render_single_note(*key)
+    return cache.get_or_render(key, lambda: render_single_note(*key))
+
+
+def render_single_note(
+    note=64,
+    duration=1.0,
+    volume=0.5,
+    sample_rate=44100,
+    attack_time=0.01,
+    decay_time=0.01,
+    sustain_level=0.7,
+    release_time=0.01,
+    waveform="harmonic",
+):
+    """Synthesize a single note from a wavetable and an ADSR envelope."""
+    return render_chord([note], duration, volume, sample_rate, attack_time,
+                        decay_time, sustain_level, release_time, waveform)
+
+
+def render_chord(
+    notes,
+    duration=1.0,
+    volume=0.5,
+    sample_rate=44100,
+    attack_time=0.01,
+    decay_time=0.01,
+    sustain_level=0.7,
+    release_time=0.01,
+    waveform="harmonic",
+):
+    """
+    Synthesize all notes of a chord into one buffer.
+
+    Every voice is read from the wavetable in one broadcasted (notes x samples)
+    operation, summed, normalized by the number of voices and shaped by one shared
+    envelope.
+    """
+    if duration < 0.1:
+        duration = 0.1
+    # adajust parametrs based on duration
+    if duration < attack_time + decay_time + release_time:
+        attack_time = duration * 0.1
+        decay_time = duration * 0.1
+        release_time = duration * 0.1
+
+    # Read every voice from the band-limited wavetable at once
+    total_samples = int(duration * sample_rate)
+    wavetable = get_wavetable(waveform)
+    if len(notes) == 1:
+        note_samples, _ = wavetable.render(
+            midi_to_frequency(notes[0]), total_samples, sample_rate)
+    else:
+        note_samples, _ = wavetable.render_mix(
+            midi_to_frequency(notes), total_samples, sample_rate)
+        note_samples /= len(notes)
+
+    # Apply the envelope to the note
+    note_samples *= adsr_envelope(total_samples, sample_rate, attack_time,
+                                  decay_time, sustain_level, release_time)
+
+    # Convert to 16-bit PCM audio
+    audio = note_samples * (2**15 - 1) * volume
+    return audio.astype(np.int16)
+
+
+def generate_chord(
+    notes,
+    duration=1.0,
+    volume=0.5,
+    sample_rate=44100,
+    attack_time=0.01,
+    decay_time=0.01,
+    sustain_level=0.7,
+    release_time=0.01,
+    waveform="harmonic",
+    cache=note_cache,
+):
+    """
+    Return the int16 samples of a chord mixed into one buffer, using the note cache.
+
+    Like generate_single_note, the cached buffer is read-only.
+    """
+    key = (tuple(notes), duration, volume, sample_rate,
+           attack_time, decay_time, sustain_level, release_time, waveform)
+    if cache is None:
+        return render_chord(*key)
+    return cache.get_or_render(key, lambda: render_chord(*key))
+
+
+def generate_note(note, *args, **kwargs):
+    """
+    Return the samples of a note or a chord as a single int16 buffer.
+
+    Parameters:
+        note (int or list): The MIDI note number or a list of MIDI note numbers.
+        *args, **kwargs: The synthesis parameters of generate_single_note.
+    """
+    if isinstance(note, (list, tuple)):
+        if len(note) == 1:
+            return generate_single_note(note[0], *args, **kwargs)
+        return generate_chord(note, *args, **kwargs)
+    return generate_single_note(note, *args, **kwargs)